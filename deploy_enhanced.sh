@@ -339,6 +339,9 @@ install_dependencies() {
     if ! python3 -c "import requests" &>/dev/null; then
         pip3 install --user requests &>/dev/null || sudo pip3 install requests &>/dev/null
     fi
+    if ! python3 -c "import dns.resolver" &>/dev/null; then
+        pip3 install --user dnspython &>/dev/null || sudo pip3 install dnspython &>/dev/null || true
+    fi
 }
 
 # Configure automatic DNS (Cloudflare)
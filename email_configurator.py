@@ -4,15 +4,158 @@ Email Configuration Script for Domain-Based Email Setup
 Automatically configures email accounts and generates SMTP credentials
 """
 
+import csv
+import functools
 import json
-import random
+import secrets
 import string
 import subprocess
 import sys
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+try:
+    import dns.exception
+    import dns.resolver
+except ImportError:
+    dns = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PASSWORD_SPECIALS = "!@#$%^&*"
+PASSWORD_CHARS = string.ascii_letters + string.digits + PASSWORD_SPECIALS
+
+CSV_HEADER = (
+    'Domain', 'Email', 'Username', 'Password',
+    'SMTP_Host', 'SMTP_Port', 'SMTP_Security',
+    'IMAP_Host', 'IMAP_Port', 'IMAP_Security'
+)
+
+_SH_TEMPLATE = (
+    "# Test {email}\n"
+    "echo 'Testing {email}...'\n"
+    "# curl --url 'smtps://{smtp_settings[host]}:{smtp_settings[port]}' "
+    "--ssl-reqd --mail-from '{email}' --mail-rcpt 'test@example.com' "
+    "--user '{email}:{password}' --upload-file -\n\n"
+)
+
+_LOWERCASE = string.ascii_lowercase.encode()
+_UPPERCASE = string.ascii_uppercase.encode()
+_DIGITS = string.digits.encode()
+_SPECIALS = PASSWORD_SPECIALS.encode()
+_POOL = PASSWORD_CHARS.encode()
+_POOL_LEN = len(_POOL)
+# Bytes at or above this value are rejected to avoid modulo bias
+_POOL_LIMIT = 256 - (256 % _POOL_LEN)
+# Maps every random byte to a password character in a single C-level pass
+_POOL_TABLE = bytes(_POOL[b % _POOL_LEN] for b in range(256))
+_POOL_REJECT = bytes(range(_POOL_LIMIT, 256))
+
+_sysrand = secrets.SystemRandom()
+
+# Output files are written in one go, so a large buffer keeps it to one syscall
+WRITE_BUFFER_SIZE = 1 << 20
+
+MX_CACHE_FILE = Path.home() / ".cache" / "email_configurator" / "mx.json"
+MX_CACHE_TTL = 3600
+
+_mx_cache = None
+
+
+def _load_mx_cache():
+    """Load MX results persisted by previous runs, dropping expired entries"""
+    global _mx_cache
+    if _mx_cache is None:
+        _mx_cache = {}
+        try:
+            with open(MX_CACHE_FILE, 'r') as f:
+                cached = json.load(f)
+            now = time.time()
+            _mx_cache = {
+                domain: entry for domain, entry in cached.items()
+                if now - entry.get('resolved_at', 0) < MX_CACHE_TTL
+            }
+        except (OSError, ValueError):
+            pass
+    return _mx_cache
+
+
+def _save_mx_cache():
+    """Persist resolved MX records so repeat runs skip the DNS queries"""
+    if not _mx_cache:
+        return
+    try:
+        MX_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(MX_CACHE_FILE, 'w') as f:
+            json.dump(_mx_cache, f)
+    except OSError:
+        pass
+
+
+@functools.lru_cache(maxsize=1024)
+def _resolve_mx(domain):
+    """
+    Resolve the MX hosts of a domain, once per process and per cache TTL
+    
+    Args:
+        domain (str): Domain name
+        
+    Returns:
+        tuple: MX hostnames ordered by preference (empty if unavailable)
+    """
+    cache = _load_mx_cache()
+    if domain in cache:
+        return tuple(host for host in cache[domain]['hosts'] if host)
+    
+    if dns is None:
+        return ()
+    
+    try:
+        answers = dns.resolver.resolve(domain, 'MX')
+    except (dns.exception.DNSException, OSError):
+        return ()
+    
+    # A null MX ("0 .") means the domain accepts no mail; it has no host
+    hosts = tuple(
+        host for host in (
+            str(r.exchange).rstrip('.')
+            for r in sorted(answers, key=lambda r: r.preference)
+        ) if host
+    )
+    cache[domain] = {'hosts': list(hosts), 'resolved_at': time.time()}
+    return hosts
+
+
+_FIRST_NAMES = (
+    'alex', 'jordan', 'morgan', 'casey', 'taylor', 'riley', 'sage',
+    'quinn', 'blake', 'jamie', 'drew', 'cameron', 'avery', 'logan',
+    'harper', 'emerson', 'phoenix', 'river', 'dakota', 'skyler'
+)
+
+_LAST_NAMES = (
+    'smith', 'johnson', 'williams', 'brown', 'jones', 'garcia',
+    'miller', 'davis', 'rodriguez', 'martinez', 'hernandez',
+    'lopez', 'gonzalez', 'wilson', 'anderson', 'thomas', 'taylor',
+    'moore', 'jackson', 'martin'
+)
+
+
+def _random_bytes(count):
+    """Draw count bytes from PASSWORD_CHARS using batched os.urandom reads"""
+    out = bytearray()
+    while len(out) < count:
+        raw = os.urandom((count - len(out)) * 2)
+        out += raw.translate(_POOL_TABLE, _POOL_REJECT)
+    del out[count:]
+    return out
+
 class EmailConfigurator:
     def __init__(self, config_file="email_config.json"):
         """
@@ -25,6 +168,10 @@ class EmailConfigurator:
         self.domains = []
         self.smtp_configs = {}
         self.email_accounts = []
+        self.accounts_by_domain = {}
+        self.mx_records = {}
+        self.max_workers = 16
+        self._print_lock = threading.Lock()
         
     def load_config(self):
         """Load configuration from JSON file"""
@@ -75,20 +222,7 @@ class EmailConfigurator:
     
     def generate_random_name(self):
         """Generate a random name for email accounts"""
-        first_names = [
-            'alex', 'jordan', 'morgan', 'casey', 'taylor', 'riley', 'sage',
-            'quinn', 'blake', 'jamie', 'drew', 'cameron', 'avery', 'logan',
-            'harper', 'emerson', 'phoenix', 'river', 'dakota', 'skyler'
-        ]
-        
-        last_names = [
-            'smith', 'johnson', 'williams', 'brown', 'jones', 'garcia',
-            'miller', 'davis', 'rodriguez', 'martinez', 'hernandez',
-            'lopez', 'gonzalez', 'wilson', 'anderson', 'thomas', 'taylor',
-            'moore', 'jackson', 'martin'
-        ]
-        
-        return f"{random.choice(first_names)}.{random.choice(last_names)}"
+        return f"{secrets.choice(_FIRST_NAMES)}.{secrets.choice(_LAST_NAMES)}"
     
     def generate_password(self, length=16):
         """
@@ -100,25 +234,53 @@ class EmailConfigurator:
         Returns:
             str: Generated password
         """
-        characters = string.ascii_letters + string.digits + "!@#$%^&*"
-        password = ''.join(random.choice(characters) for _ in range(length))
-        
-        # Ensure at least one of each type
-        password = (
-            random.choice(string.ascii_lowercase) +
-            random.choice(string.ascii_uppercase) +
-            random.choice(string.digits) +
-            random.choice("!@#$%^&*") +
-            password[4:]
-        )
-        
-        return ''.join(random.sample(password, len(password)))
+        return self.generate_passwords(1, length)[0]
+    
+    def generate_passwords(self, count, length=16):
+        """
+        Generate several secure random passwords from a single random draw
+        
+        Args:
+            count (int): Number of passwords
+            length (int): Password length
+            
+        Returns:
+            list: Generated passwords
+            
+        Raises:
+            ValueError: If length is too short to hold one character of each type
+        """
+        if length < 4:
+            raise ValueError(f"Password length must be at least 4, got {length}")
+        
+        filler = length - 4
+        pool = _random_bytes(count * filler)
+        passwords = []
+        
+        for i in range(count):
+            # Ensure at least one of each type
+            buf = bytearray((
+                secrets.choice(_LOWERCASE),
+                secrets.choice(_UPPERCASE),
+                secrets.choice(_DIGITS),
+                secrets.choice(_SPECIALS)
+            ))
+            buf += pool[i * filler:(i + 1) * filler]
+            
+            _sysrand.shuffle(buf)
+            passwords.append(buf.decode())
+        
+        return passwords
     
     def create_email_accounts(self):
         """Create email accounts for each domain"""
         print("\n🔧 Creating email accounts...")
         
+        # Draw every password up front instead of one at a time
+        passwords = iter(self.generate_passwords(3 * len(self.domains)))
+        
         for domain in self.domains:
+            domain = sys.intern(domain)
             print(f"\n📧 Processing domain: {domain}")
             
             domain_accounts = []
@@ -126,37 +288,38 @@ class EmailConfigurator:
             # Get SMTP configuration for this domain
             smtp_config = self.smtp_configs.get(domain, self.smtp_configs.get('default', {}))
             
+            # Format SMTP/IMAP settings once per domain
+            smtp_host = smtp_config.get('smtp_host', 'mail.{domain}').format(domain=domain)
+            smtp_port = smtp_config.get('smtp_port', 587)
+            smtp_security = smtp_config.get('smtp_security', 'STARTTLS')
+            imap_host = smtp_config.get('imap_host', 'mail.{domain}').format(domain=domain)
+            imap_port = smtp_config.get('imap_port', 993)
+            imap_security = smtp_config.get('imap_security', 'SSL')
+            
+            # Resolve MX once per domain; it is only reported, and flagged
+            # when incoming mail would not reach the configured server
+            mx_hosts = _resolve_mx(domain)
+            self.mx_records[domain] = mx_hosts
+            if mx_hosts:
+                print(f"  MX: {', '.join(mx_hosts)}")
+                if smtp_host not in mx_hosts:
+                    print(f"  ⚠ MX does not point to {smtp_host}; incoming mail will not reach it")
+            
             for i in range(3):  # 3 emails per domain
                 # Generate account details
                 username = self.generate_random_name()
                 email = f"{username}@{domain}"
-                password = self.generate_password()
+                password = next(passwords)
                 
-                # Format SMTP settings
-                smtp_host = smtp_config.get('smtp_host', 'mail.{domain}').format(domain=domain)
-                smtp_port = smtp_config.get('smtp_port', 587)
-                imap_host = smtp_config.get('imap_host', 'mail.{domain}').format(domain=domain)
-                imap_port = smtp_config.get('imap_port', 993)
+                creds = {'username': email, 'password': password}
                 
                 account = {
                     'email': email,
                     'username': username,
                     'password': password,
                     'domain': domain,
-                    'smtp_settings': {
-                        'host': smtp_host,
-                        'port': smtp_port,
-                        'security': smtp_config.get('smtp_security', 'STARTTLS'),
-                        'username': email,
-                        'password': password
-                    },
-                    'imap_settings': {
-                        'host': imap_host,
-                        'port': imap_port,
-                        'security': smtp_config.get('imap_security', 'SSL'),
-                        'username': email,
-                        'password': password
-                    }
+                    'smtp_settings': {'host': smtp_host, 'port': smtp_port, 'security': smtp_security, **creds},
+                    'imap_settings': {'host': imap_host, 'port': imap_port, 'security': imap_security, **creds}
                 }
                 
                 domain_accounts.append(account)
@@ -164,37 +327,47 @@ class EmailConfigurator:
                 
                 print(f"  ✓ Created: {email}")
             
-            # Simulate creating accounts on the server (replace with actual implementation)
-            self.configure_server_accounts(domain, domain_accounts)
+            self.accounts_by_domain[domain] = domain_accounts
+        
+        _save_mx_cache()
+        
+        # Simulate creating accounts on the server (replace with actual implementation)
+        jobs = [
+            (domain, account)
+            for domain, accounts in self.accounts_by_domain.items()
+            for account in accounts
+        ]
+        print(f"\n🔧 Configuring server for {len(jobs)} accounts...")
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(lambda job: self._configure_one(*job), jobs))
     
-    def configure_server_accounts(self, domain, accounts):
+    def _configure_one(self, domain, account):
         """
-        Configure email accounts on the server
-        Replace this with actual server configuration commands
+        Configure a single email account on the server
         
         Args:
             domain (str): Domain name
-            accounts (list): List of email accounts to create
+            account (dict): Email account to create
         """
-        print(f"  🔧 Configuring server for {domain}...")
+        # Example commands - replace with your actual server setup
+        # These are placeholder commands for different mail servers
         
-        for account in accounts:
-            # Example commands - replace with your actual server setup
-            # These are placeholder commands for different mail servers
-            
-            # For Postfix/Dovecot setup:
-            postfix_cmd = f"# postfix user creation for {account['email']}"
-            dovecot_cmd = f"# dovecot mailbox creation for {account['email']}"
-            
-            # For cPanel/WHM:
-            cpanel_cmd = f"# uapi --user={domain} Email add_pop email={account['username']} password={account['password']} domain={domain}"
-            
-            # For Zimbra:
-            zimbra_cmd = f"# zmprov ca {account['email']} {account['password']}"
-            
+        # For Postfix/Dovecot setup:
+        postfix_cmd = f"# postfix user creation for {account['email']}"
+        dovecot_cmd = f"# dovecot mailbox creation for {account['email']}"
+        
+        # For cPanel/WHM:
+        cpanel_cmd = f"# uapi --user={domain} Email add_pop email={account['username']} password={account['password']} domain={domain}"
+        
+        # For Zimbra:
+        zimbra_cmd = f"# zmprov ca {account['email']} {account['password']}"
+        
+        # Uncomment and modify based on your mail server:
+        # subprocess.run(actual_command, shell=True, check=True)
+        
+        with self._print_lock:
             print(f"    - Account: {account['email']}")
-            # Uncomment and modify based on your mail server:
-            # subprocess.run(actual_command, shell=True, check=True)
     
     def generate_output_files(self):
         """Generate output files with all credentials and configurations"""
@@ -204,7 +377,26 @@ class EmailConfigurator:
         output_dir = Path(f"email_credentials_{timestamp}")
         output_dir.mkdir(exist_ok=True)
         
-        # Generate JSON output
+        # The writers only read the account list, so they can run side by side
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(self._write_json, output_dir, timestamp),
+                executor.submit(self._write_csv, output_dir),
+                executor.submit(self._write_txt, output_dir),
+                executor.submit(self._write_sh, output_dir)
+            ]
+            json_file, csv_file, txt_file, sh_file = [future.result() for future in futures]
+        
+        print(f"\n📄 Output files generated in: {output_dir}")
+        print(f"  - JSON: {json_file}")
+        print(f"  - CSV: {csv_file}")
+        print(f"  - Text: {txt_file}")
+        print(f"  - Test script: {sh_file}")
+        
+        return output_dir
+    
+    def _write_json(self, output_dir, timestamp):
+        """Write the JSON credentials file"""
         json_output = {
             'timestamp': timestamp,
             'total_accounts': len(self.email_accounts),
@@ -213,74 +405,88 @@ class EmailConfigurator:
         }
         
         json_file = output_dir / "email_credentials.json"
-        with open(json_file, 'w') as f:
-            json.dump(json_output, f, indent=2)
+        if orjson is not None:
+            with open(json_file, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+                f.write(orjson.dumps(json_output))
+        else:
+            with open(json_file, 'w', buffering=WRITE_BUFFER_SIZE, encoding='utf-8') as f:
+                json.dump(json_output, f, separators=(',', ':'))
         
-        # Generate CSV output
+        return json_file
+    
+    def _write_csv(self, output_dir):
+        """Write the CSV credentials file"""
         csv_file = output_dir / "email_credentials.csv"
-        with open(csv_file, 'w') as f:
-            f.write("Domain,Email,Username,Password,SMTP_Host,SMTP_Port,SMTP_Security,IMAP_Host,IMAP_Port,IMAP_Security\n")
-            for account in self.email_accounts:
-                f.write(f"{account['domain']},{account['email']},{account['username']},{account['password']},"
-                       f"{account['smtp_settings']['host']},{account['smtp_settings']['port']},{account['smtp_settings']['security']},"
-                       f"{account['imap_settings']['host']},{account['imap_settings']['port']},{account['imap_settings']['security']}\n")
-        
-        # Generate formatted text output
+        with open(csv_file, 'w', newline='', buffering=WRITE_BUFFER_SIZE, encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(CSV_HEADER)
+            writer.writerows([
+                (
+                    account['domain'], account['email'], account['username'], account['password'],
+                    account['smtp_settings']['host'], account['smtp_settings']['port'], account['smtp_settings']['security'],
+                    account['imap_settings']['host'], account['imap_settings']['port'], account['imap_settings']['security']
+                )
+                for account in self.email_accounts
+            ])
+        
+        return csv_file
+    
+    def _write_txt(self, output_dir):
+        """Write the formatted text report"""
         txt_file = output_dir / "email_credentials.txt"
-        with open(txt_file, 'w') as f:
-            f.write("EMAIL CONFIGURATION REPORT\n")
-            f.write("=" * 50 + "\n\n")
-            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Total Domains: {len(self.domains)}\n")
-            f.write(f"Total Accounts: {len(self.email_accounts)}\n\n")
+        lines = [
+            "EMAIL CONFIGURATION REPORT\n",
+            "=" * 50 + "\n\n",
+            f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
+            f"Total Domains: {len(self.domains)}\n",
+            f"Total Accounts: {len(self.email_accounts)}\n\n"
+        ]
+        
+        for domain in self.domains:
+            lines.append(f"\nDOMAIN: {domain}\n")
+            lines.append("-" * 30 + "\n")
             
-            for domain in self.domains:
-                f.write(f"\nDOMAIN: {domain}\n")
-                f.write("-" * 30 + "\n")
-                
-                domain_accounts = [acc for acc in self.email_accounts if acc['domain'] == domain]
-                
-                for i, account in enumerate(domain_accounts, 1):
-                    f.write(f"\nAccount {i}:\n")
-                    f.write(f"  Email: {account['email']}\n")
-                    f.write(f"  Password: {account['password']}\n")
-                    f.write(f"  \n")
-                    f.write(f"  SMTP Configuration:\n")
-                    f.write(f"    Host: {account['smtp_settings']['host']}\n")
-                    f.write(f"    Port: {account['smtp_settings']['port']}\n")
-                    f.write(f"    Security: {account['smtp_settings']['security']}\n")
-                    f.write(f"    Username: {account['smtp_settings']['username']}\n")
-                    f.write(f"    Password: {account['smtp_settings']['password']}\n")
-                    f.write(f"  \n")
-                    f.write(f"  IMAP Configuration:\n")
-                    f.write(f"    Host: {account['imap_settings']['host']}\n")
-                    f.write(f"    Port: {account['imap_settings']['port']}\n")
-                    f.write(f"    Security: {account['imap_settings']['security']}\n")
-                    f.write(f"    Username: {account['imap_settings']['username']}\n")
-                    f.write(f"    Password: {account['imap_settings']['password']}\n")
-        
-        # Generate shell script for easy testing
-        sh_file = output_dir / "test_connections.sh"
-        with open(sh_file, 'w') as f:
-            f.write("#!/bin/bash\n")
-            f.write("# Email Connection Test Script\n\n")
+            domain_accounts = self.accounts_by_domain.get(domain, [])
             
-            for account in self.email_accounts:
-                f.write(f"# Test {account['email']}\n")
-                f.write(f"echo 'Testing {account['email']}...'\n")
-                f.write(f"# curl --url 'smtps://{account['smtp_settings']['host']}:{account['smtp_settings']['port']}' "
-                       f"--ssl-reqd --mail-from '{account['email']}' --mail-rcpt 'test@example.com' "
-                       f"--user '{account['email']}:{account['password']}' --upload-file -\n\n")
+            for i, account in enumerate(domain_accounts, 1):
+                smtp = account['smtp_settings']
+                imap = account['imap_settings']
+                lines.append(
+                    f"\nAccount {i}:\n"
+                    f"  Email: {account['email']}\n"
+                    f"  Password: {account['password']}\n"
+                    f"  \n"
+                    f"  SMTP Configuration:\n"
+                    f"    Host: {smtp['host']}\n"
+                    f"    Port: {smtp['port']}\n"
+                    f"    Security: {smtp['security']}\n"
+                    f"    Username: {smtp['username']}\n"
+                    f"    Password: {smtp['password']}\n"
+                    f"  \n"
+                    f"  IMAP Configuration:\n"
+                    f"    Host: {imap['host']}\n"
+                    f"    Port: {imap['port']}\n"
+                    f"    Security: {imap['security']}\n"
+                    f"    Username: {imap['username']}\n"
+                    f"    Password: {imap['password']}\n"
+                )
         
-        os.chmod(sh_file, 0o755)
+        with open(txt_file, 'w', buffering=WRITE_BUFFER_SIZE, encoding='utf-8') as f:
+            f.write(''.join(lines))
         
-        print(f"\n📄 Output files generated in: {output_dir}")
-        print(f"  - JSON: {json_file}")
-        print(f"  - CSV: {csv_file}")
-        print(f"  - Text: {txt_file}")
-        print(f"  - Test script: {sh_file}")
+        return txt_file
+    
+    def _write_sh(self, output_dir):
+        """Write the connection test script"""
+        sh_file = output_dir / "test_connections.sh"
+        body = ''.join(_SH_TEMPLATE.format_map(account) for account in self.email_accounts)
         
-        return output_dir
+        with open(sh_file, 'w', buffering=WRITE_BUFFER_SIZE, encoding='utf-8') as f:
+            f.write("#!/bin/bash\n# Email Connection Test Script\n\n" + body)
+        
+        os.chmod(sh_file, 0o755)
+        
+        return sh_file
     
     def print_summary(self):
         """Print a summary of created accounts"""
@@ -290,7 +496,7 @@ class EmailConfigurator:
         
         for domain in self.domains:
             print(f"\n📧 Domain: {domain}")
-            domain_accounts = [acc for acc in self.email_accounts if acc['domain'] == domain]
+            domain_accounts = self.accounts_by_domain.get(domain, [])
             
             for account in domain_accounts:
                 print(f"  ✓ {account['email']} | Password: {account['password']}")
@@ -4,17 +4,286 @@ Enhanced Email Configurator with DNS Management
 Handles DNS detection, conflict resolution, and automatic configuration
 """
 
+import csv
+import gzip
 import json
 import random
+import re
+import secrets
 import string
 import subprocess
 import sys
 import os
 import requests
+import tempfile
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
 from pathlib import Path
 
+try:
+    import dns.exception
+    import dns.resolver
+except ImportError:
+    dns = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# DNS answers keyed by (qtype, name, server): (fetched_at, expires_at, data)
+# data holds dnspython rdata objects, or `dig +short` lines when dnspython is missing
+_DNS_CACHE = {}
+_DNS_CACHE_LOCK = threading.Lock()
+DNS_CACHE_TTL = 300
+
+# Errors raised by dnspython lookups (none when it is not installed)
+_DNS_ERRORS = (dns.exception.DNSException,) if dns else ()
+
+# Queries go to the system resolver and are replicated to these
+# resolvers; the first answer wins
+PUBLIC_RESOLVERS = ['1.1.1.1', '8.8.8.8', '9.9.9.9']
+
+def _make_resolver(nameserver):
+    resolver = dns.resolver.Resolver(configure=False)
+    resolver.nameservers = [nameserver]
+    return resolver
+
+_RESOLVERS = [_make_resolver(ns) for ns in PUBLIC_RESOLVERS] if dns else []
+# Shared by every race so concurrent lookups don't each start their own
+# threads; created on the first lookup
+_race_pool = None
+_RACE_POOL_LOCK = threading.Lock()
+
+def _get_race_pool():
+    global _race_pool
+    with _RACE_POOL_LOCK:
+        if _race_pool is None:
+            _race_pool = ThreadPoolExecutor(max_workers=4 * (len(PUBLIC_RESOLVERS) + 1))
+    return _race_pool
+
+def _cache_get(key, max_age):
+    """Return cached data that is within both its TTL and max_age, else None"""
+    now = time.time()
+    with _DNS_CACHE_LOCK:
+        cached = _DNS_CACHE.get(key)
+    if cached and now < cached[1] and now - cached[0] < max_age:
+        return cached[2]
+    return None
+
+def _cache_put(key, ttl, data):
+    now = time.time()
+    with _DNS_CACHE_LOCK:
+        _DNS_CACHE[key] = (now, now + ttl, data)
+
+def _race_resolve(name, qtype):
+    """
+    Send the same query to the system resolver and every public resolver
+    and keep the first answer
+    
+    NXDOMAIN and NoAnswer from the system resolver are final, so
+    split-horizon names resolve as this host sees them. The same answers
+    from a public resolver only count if the system resolver fails too, and
+    other failures only propagate if every resolver fails.
+    
+    Returns:
+        dns.resolver.Answer: The first answer received
+    
+    Raises:
+        dns.exception.DNSException: If no resolver could answer
+    """
+    pool = _get_race_pool()
+    system = pool.submit(dns.resolver.resolve, name, qtype, lifetime=10)
+    pending = {system} | {pool.submit(r.resolve, name, qtype, lifetime=10) for r in _RESOLVERS}
+    negative = None
+    last_error = None
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer) as e:
+                    if future is system:
+                        raise
+                    negative = negative or e
+                except dns.exception.DNSException as e:
+                    last_error = e
+                except Exception as e:
+                    last_error = dns.exception.DNSException(f"{name} {qtype}: {e}")
+        raise negative or last_error
+    finally:
+        for future in pending:
+            future.cancel()
+
+def _resolve_records(qtype, name, max_age=DNS_CACHE_TTL):
+    """
+    Resolve a record with dnspython, caching the answer for its own TTL
+    
+    Returns:
+        list: rdata objects (empty for NXDOMAIN / no answer)
+    """
+    key = (qtype, name, None)
+    records = _cache_get(key, max_age)
+    if records is not None:
+        return records
+    
+    try:
+        answer = _race_resolve(name, qtype)
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+        records, ttl = [], DNS_CACHE_TTL
+    else:
+        records, ttl = list(answer), answer.rrset.ttl
+    
+    _cache_put(key, ttl, records)
+    return records
+
+def _dig(qtype, name, server=None):
+    """Run `dig +short` and return its answer lines, or None if dig failed"""
+    cmd = ['dig', '+short', qtype, name]
+    if server:
+        cmd.append('@' + server)
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+    lines = [line.strip() for line in result.stdout.strip().split('\n') if line.strip()]
+    return lines if result.returncode == 0 else None
+
+def _prefetch_dig(names, qtypes=('MX', 'NS')):
+    """
+    Resolve many records with a single `dig -f` batch process and seed the cache
+    
+    Args:
+        names (list): Domain names to query
+        qtypes (tuple): Record types to query for each name
+    """
+    queries = {(qtype, name.lower()): (qtype, name) for name in names for qtype in qtypes}
+    if not queries:
+        return
+    
+    try:
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as batch:
+            batch.write(''.join(f"{name} {qtype}\n" for qtype, name in queries.values()))
+            batch.flush()
+            result = subprocess.run(['dig', '+noall', '+answer', '-f', batch.name],
+                                    capture_output=True, text=True, timeout=10 + 2 * len(queries))
+    except (OSError, subprocess.SubprocessError):
+        return
+    
+    if result.returncode != 0:
+        return
+    
+    # Answer lines look like: "example.com. 300 IN MX 10 mail.example.com."
+    answers = {key: [] for key in queries}
+    ttls = {}
+    for line in result.stdout.splitlines():
+        parts = line.split(None, 4)
+        if len(parts) == 5 and not line.startswith(';'):
+            owner, ttl, _rclass, rtype, rdata = parts
+            key = (rtype, owner.rstrip('.').lower())
+            if key in answers:
+                answers[key].append(rdata.strip())
+                ttls[key] = min(ttls.get(key, DNS_CACHE_TTL), int(ttl))
+    
+    for key, lines in answers.items():
+        qtype, name = queries[key]
+        _cache_put((qtype, name, None), ttls.get(key, DNS_CACHE_TTL), lines)
+
+def _cached_lookup(qtype, name, server=None, max_age=DNS_CACHE_TTL):
+    """
+    Resolve a record, reusing answers younger than max_age seconds
+    
+    Uses dnspython when it is installed and no specific server is
+    requested, `dig` otherwise.
+    
+    Returns:
+        list: Non-empty answer lines
+    """
+    if _RESOLVERS and server is None:
+        return [rdata.to_text() for rdata in _resolve_records(qtype, name, max_age)]
+    
+    key = (qtype, name, server)
+    lines = _cache_get(key, max_age)
+    if lines is not None:
+        return lines
+    
+    lines = _dig(qtype, name, server)
+    if lines is None:
+        return []
+    
+    _cache_put(key, DNS_CACHE_TTL, lines)
+    return lines
+
+_PW_LOWER = string.ascii_lowercase.encode()
+_PW_UPPER = string.ascii_uppercase.encode()
+_PW_DIGITS = string.digits.encode()
+_PW_SPECIALS = b"!@#$%^&*"
+_PW_ALPHA = _PW_LOWER + _PW_UPPER + _PW_DIGITS + _PW_SPECIALS
+_sysrand = secrets.SystemRandom()
+
+_FIRST_NAMES = (
+    'alex', 'jordan', 'morgan', 'casey', 'taylor', 'riley', 'sage',
+    'quinn', 'blake', 'jamie', 'drew', 'cameron', 'avery', 'logan',
+    'harper', 'emerson', 'phoenix', 'river', 'dakota', 'skyler'
+)
+
+_LAST_NAMES = (
+    'smith', 'johnson', 'williams', 'brown', 'jones', 'garcia',
+    'miller', 'davis', 'rodriguez', 'martinez', 'hernandez',
+    'lopez', 'gonzalez', 'wilson', 'anderson', 'thomas', 'taylor',
+    'moore', 'jackson', 'martin'
+)
+
+CSV_HEADER = (
+    'Domain', 'Email', 'Username', 'Password',
+    'SMTP_Host', 'SMTP_Port', 'SMTP_Security',
+    'IMAP_Host', 'IMAP_Port', 'IMAP_Security'
+)
+
+# Public IP echo services, probed in parallel by get_server_ip
+IP_SERVICES = [
+    'https://ipinfo.io/ip',
+    'https://icanhazip.com',
+    'https://ifconfig.me/ip'
+]
+SERVER_IP_TTL = 300
+
+# One keep-alive session for every HTTP call made by this script
+_SESSION = requests.Session()
+_SESSION.mount('https://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4))
+# (fetched_at, ip) of the last successful get_server_ip call
+_server_ip_cache = None
+
+_IPV4_OCTET = r'(?:25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])'
+_IPV4_RE = re.compile(rf'(?:{_IPV4_OCTET}\.){{3}}{_IPV4_OCTET}')
+
+# Nameserver markers of the DNS providers we have instructions for
+_NS_RE = re.compile(r'(ovh\.net|cloudflare\.com|digitalocean\.com|route53|amazonaws\.com|namecheap\.com)')
+_NS_PROVIDERS = {
+    'ovh.net': 'ovh',
+    'cloudflare.com': 'cloudflare',
+    'digitalocean.com': 'digitalocean',
+    'route53': 'route53',
+    'amazonaws.com': 'route53',
+    'namecheap.com': 'namecheap'
+}
+
+# MX hosts of hosted mail services that conflict with our own mail server
+_OVH_CONFLICT = ('ovh_mx_plan', 'OVH MX Plan service detected',
+                 'Delete OVH MX records or suspend MX Plan service')
+_GOOGLE_CONFLICT = ('google_workspace', 'Google Workspace detected',
+                    'Disable Google Workspace or use subdomain')
+_M365_CONFLICT = ('microsoft_365', 'Microsoft 365 detected',
+                  'Disable Microsoft 365 or use subdomain')
+# Checked in order; the first suffix matching an MX host decides its conflict
+_SUFFIX_DISPATCH = (
+    ('mail.ovh.net', _OVH_CONFLICT),
+    ('google.com', _GOOGLE_CONFLICT),
+    ('googlemail.com', _GOOGLE_CONFLICT),
+    ('protection.outlook.com', _M365_CONFLICT),
+    ('outlook.com', _M365_CONFLICT)
+)
+
 class DNSManager:
     def __init__(self, domain):
         """Initialize DNS manager for a domain"""
@@ -22,16 +291,18 @@ class DNSManager:
         self.current_mx = []
         self.dns_provider = None
         self.conflicts = []
+        self._suggestions_cache = None
         
     def analyze_dns(self):
         """Analyze current DNS configuration"""
         log("🔍 Analyzing DNS configuration for " + self.domain)
         
-        # Check current MX records
-        self.current_mx = self.get_mx_records()
-        
-        # Detect DNS provider
-        self.dns_provider = self.detect_dns_provider()
+        return self.summarize_analysis(self.get_mx_records(), self.detect_dns_provider())
+    
+    def summarize_analysis(self, mx_records, dns_provider):
+        """Record looked-up MX records and provider, and check them for conflicts"""
+        self.current_mx = mx_records
+        self.dns_provider = dns_provider
         
         # Check for conflicts
         self.check_conflicts()
@@ -46,39 +317,33 @@ class DNSManager:
     def get_mx_records(self):
         """Get current MX records for domain"""
         try:
-            result = subprocess.run(['dig', '+short', 'MX', self.domain], 
-                                  capture_output=True, text=True, timeout=10)
-            mx_records = []
-            for line in result.stdout.strip().split('\n'):
-                if line and line.strip():
-                    parts = line.strip().split()
+            if _RESOLVERS:
+                mx_records = [
+                    {'priority': rdata.preference, 'server': str(rdata.exchange).rstrip('.')}
+                    for rdata in _resolve_records('MX', self.domain)
+                ]
+            else:
+                mx_records = []
+                for line in _cached_lookup('MX', self.domain):
+                    parts = line.split()
                     if len(parts) >= 2:
                         priority = parts[0]
                         server = parts[1].rstrip('.')
                         mx_records.append({'priority': int(priority), 'server': server})
             return sorted(mx_records, key=lambda x: x['priority'])
-        except Exception as e:
+        except _DNS_ERRORS + (OSError, subprocess.SubprocessError, ValueError) as e:
             warn(f"Could not get MX records: {e}")
             return []
     
     def detect_dns_provider(self):
         """Detect DNS provider from nameservers"""
         try:
-            result = subprocess.run(['dig', '+short', 'NS', self.domain], 
-                                  capture_output=True, text=True, timeout=10)
-            nameservers = [ns.strip().rstrip('.') for ns in result.stdout.strip().split('\n') if ns.strip()]
+            nameservers = [ns.rstrip('.') for ns in _cached_lookup('NS', self.domain)]
             
             for ns in nameservers:
-                if 'ovh.net' in ns:
-                    return 'ovh'
-                elif 'cloudflare.com' in ns:
-                    return 'cloudflare'
-                elif 'digitalocean.com' in ns:
-                    return 'digitalocean'
-                elif 'route53' in ns or 'amazonaws.com' in ns:
-                    return 'route53'
-                elif 'namecheap.com' in ns:
-                    return 'namecheap'
+                match = _NS_RE.search(ns)
+                if match:
+                    return _NS_PROVIDERS[match.group(1)]
             
             return 'unknown'
         except Exception as e:
@@ -89,35 +354,19 @@ class DNSManager:
         """Check for common DNS conflicts"""
         conflicts = []
         
-        # Check for OVH MX Plan
-        for mx in self.current_mx:
-            if 'mail.ovh.net' in mx['server']:
-                conflicts.append({
-                    'type': 'ovh_mx_plan',
-                    'description': 'OVH MX Plan service detected',
-                    'record': mx,
-                    'solution': 'Delete OVH MX records or suspend MX Plan service'
-                })
-        
-        # Check for Google Workspace
+        # OVH MX Plan, Google Workspace and Microsoft 365 in a single pass
         for mx in self.current_mx:
-            if 'google.com' in mx['server'] or 'googlemail.com' in mx['server']:
-                conflicts.append({
-                    'type': 'google_workspace',
-                    'description': 'Google Workspace detected',
-                    'record': mx,
-                    'solution': 'Disable Google Workspace or use subdomain'
-                })
-        
-        # Check for Microsoft 365
-        for mx in self.current_mx:
-            if 'outlook.com' in mx['server'] or 'protection.outlook.com' in mx['server']:
-                conflicts.append({
-                    'type': 'microsoft_365',
-                    'description': 'Microsoft 365 detected',
-                    'record': mx,
-                    'solution': 'Disable Microsoft 365 or use subdomain'
-                })
+            server = mx['server'].lower()
+            for suffix, (conflict_type, description, solution) in _SUFFIX_DISPATCH:
+                # Anchored on a label boundary so e.g. "nogoogle.com" does not match
+                if server == suffix or server.endswith('.' + suffix):
+                    conflicts.append({
+                        'type': conflict_type,
+                        'description': description,
+                        'record': mx,
+                        'solution': solution
+                    })
+                    break
         
         self.conflicts = conflicts
         return conflicts
@@ -128,6 +377,11 @@ class DNSManager:
     
     def suggest_dns_configuration(self, server_ip):
         """Suggest DNS configuration based on provider"""
+        # The result only depends on the domain and server IP
+        if self._suggestions_cache and self._suggestions_cache[0] == server_ip:
+            return self._suggestions_cache[1]
+        
+        mail_host = f'mail.{self.domain}'
         suggestions = {
             'required_records': [
                 {
@@ -139,7 +393,7 @@ class DNSManager:
                 {
                     'type': 'MX',
                     'name': '@',
-                    'value': f'mail.{self.domain}',
+                    'value': mail_host,
                     'priority': 10,
                     'ttl': 3600
                 },
@@ -160,29 +414,41 @@ class DNSManager:
                 {
                     'type': 'CNAME',
                     'name': 'autoconfig',
-                    'value': f'mail.{self.domain}',
+                    'value': mail_host,
                     'ttl': 3600
                 },
                 {
                     'type': 'CNAME',
                     'name': 'autodiscover', 
-                    'value': f'mail.{self.domain}',
+                    'value': mail_host,
                     'ttl': 3600
                 }
             ]
         }
         
+        self._suggestions_cache = (server_ip, suggestions)
         return suggestions
 
+# (epoch second, "%H:%M:%S") of the last log line, reused within the same second
+_last_stamp = (None, "")
+
+def _emit(prefix, message):
+    """Write one timestamped log line"""
+    global _last_stamp
+    now = int(time.time())
+    second, timestamp = _last_stamp
+    if now != second:
+        timestamp = time.strftime("%H:%M:%S", time.localtime(now))
+        _last_stamp = (now, timestamp)
+    sys.stdout.write(f"[{timestamp}] {prefix}{message}\n")
+
 def log(message):
     """Enhanced logging function"""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    print(f"[{timestamp}] {message}")
+    _emit("", message)
 
 def warn(message):
     """Warning logging function"""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    print(f"[{timestamp}] ⚠️  {message}")
+    _emit("⚠️  ", message)
 
 class EnhancedEmailConfigurator:
     def __init__(self, config_file="email_config.json"):
@@ -196,44 +462,56 @@ class EnhancedEmailConfigurator:
         
     def get_server_ip(self):
         """Get server public IP"""
+        global _server_ip_cache
+        if _server_ip_cache and time.time() - _server_ip_cache[0] < SERVER_IP_TTL:
+            self.server_ip = _server_ip_cache[1]
+            return self.server_ip
+        
         try:
-            # Try multiple services to get IP
-            services = [
-                'https://ipinfo.io/ip',
-                'https://icanhazip.com',
-                'https://ifconfig.me/ip'
-            ]
+            # Query every service at once and keep the first valid answer
+            ip = None
+            executor = ThreadPoolExecutor(max_workers=len(IP_SERVICES))
+            futures = [executor.submit(self.probe_ip_service, service) for service in IP_SERVICES]
+            try:
+                for future in as_completed(futures):
+                    try:
+                        ip = future.result()
+                    except Exception:
+                        continue
+                    if ip:
+                        break
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
             
-            for service in services:
-                try:
-                    response = requests.get(service, timeout=5)
-                    if response.status_code == 200:
-                        ip = response.text.strip()
-                        if self.is_valid_ip(ip):
-                            self.server_ip = ip
-                            return ip
-                except:
-                    continue
+            if not ip:
+                # Fallback to dig
+                answers = _cached_lookup('A', 'myip.opendns.com', server='resolver1.opendns.com')
+                if answers and self.is_valid_ip(answers[0]):
+                    ip = answers[0]
             
-            # Fallback to dig
-            result = subprocess.run(['dig', '+short', 'myip.opendns.com', '@resolver1.opendns.com'], 
-                                  capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                ip = result.stdout.strip()
-                if self.is_valid_ip(ip):
-                    self.server_ip = ip
-                    return ip
-                    
-            raise Exception("Could not determine server IP")
+            if not ip:
+                raise Exception("Could not determine server IP")
+            
+            _server_ip_cache = (time.time(), ip)
+            self.server_ip = ip
+            return ip
             
         except Exception as e:
             warn(f"Could not get server IP: {e}")
             return None
     
+    def probe_ip_service(self, service):
+        """Ask one IP echo service for our public IP"""
+        response = _SESSION.get(service, timeout=5)
+        if response.status_code == 200:
+            ip = response.text.strip()
+            if self.is_valid_ip(ip):
+                return ip
+        return None
+    
     def is_valid_ip(self, ip):
         """Validate IP address format"""
-        parts = ip.split('.')
-        return len(parts) == 4 and all(part.isdigit() and 0 <= int(part) <= 255 for part in parts)
+        return _IPV4_RE.fullmatch(ip) is not None
     
     def analyze_all_domains(self):
         """Analyze DNS for all domains"""
@@ -241,9 +519,24 @@ class EnhancedEmailConfigurator:
         
         analysis_results = {}
         
-        for domain in self.domains:
-            dns_manager = DNSManager(domain)
-            analysis = dns_manager.analyze_dns()
+        # Without dnspython every lookup forks dig, so batch them up front
+        if not _RESOLVERS:
+            _prefetch_dig(self.domains)
+        
+        # One flat pool runs the MX and NS lookups of every domain
+        managers = {domain: DNSManager(domain) for domain in self.domains}
+        with ThreadPoolExecutor(max_workers=min(32, 2 * len(managers) or 1)) as executor:
+            lookups = {
+                domain: (executor.submit(manager.get_mx_records),
+                         executor.submit(manager.detect_dns_provider))
+                for domain, manager in managers.items()
+            }
+            results = [
+                (domain, manager, manager.summarize_analysis(mx.result(), provider.result()))
+                for (domain, manager), (mx, provider) in zip(managers.items(), lookups.values())
+            ]
+        
+        for domain, dns_manager, analysis in results:
             self.dns_managers[domain] = dns_manager
             analysis_results[domain] = analysis
             
@@ -341,28 +634,30 @@ class EnhancedEmailConfigurator:
         log(f"⏳ Waiting for DNS propagation for {domain}...")
         
         start_time = time.time()
+        last_progress_log = start_time
+        attempt = 0
         while time.time() - start_time < timeout:
+            # Back off 5s, 10s, 20s, 40s, then every 60s, with jitter
+            delay = min(60, 5 * 2 ** attempt)
+            attempt += 1
             try:
-                result = subprocess.run(['dig', '+short', 'MX', domain], 
-                                      capture_output=True, text=True, timeout=10)
-                
-                if result.stdout.strip():
-                    mx_records = result.stdout.strip().split('\n')
-                    for mx in mx_records:
-                        if f'mail.{domain}' in mx:
-                            log(f"✅ DNS propagated for {domain}")
-                            return True
+                # Only reuse answers fetched since the previous poll
+                for mx in _cached_lookup('MX', domain, max_age=5):
+                    if f'mail.{domain}' in mx:
+                        log(f"✅ DNS propagated for {domain}")
+                        return True
                 
                 # Show progress every 2 minutes
-                elapsed = int(time.time() - start_time)
-                if elapsed % 120 == 0 and elapsed > 0:
-                    log(f"⏳ Still waiting... ({elapsed//60} minutes elapsed)")
-                
-                time.sleep(30)
+                now = time.time()
+                if now - last_progress_log >= 120:
+                    log(f"⏳ Still waiting... ({int(now - start_time)//60} minutes elapsed)")
+                    last_progress_log = now
                 
             except Exception as e:
                 warn(f"DNS check failed: {e}")
-                time.sleep(60)
+                delay = 60
+            
+            time.sleep(delay + random.uniform(0, delay * 0.1))
         
         warn(f"⏰ DNS propagation timeout for {domain}")
         return False
@@ -418,41 +713,34 @@ class EnhancedEmailConfigurator:
     
     def generate_random_name(self):
         """Generate a random name for email accounts"""
-        first_names = [
-            'alex', 'jordan', 'morgan', 'casey', 'taylor', 'riley', 'sage',
-            'quinn', 'blake', 'jamie', 'drew', 'cameron', 'avery', 'logan',
-            'harper', 'emerson', 'phoenix', 'river', 'dakota', 'skyler'
-        ]
-        
-        last_names = [
-            'smith', 'johnson', 'williams', 'brown', 'jones', 'garcia',
-            'miller', 'davis', 'rodriguez', 'martinez', 'hernandez',
-            'lopez', 'gonzalez', 'wilson', 'anderson', 'thomas', 'taylor',
-            'moore', 'jackson', 'martin'
-        ]
-        
-        return f"{random.choice(first_names)}.{random.choice(last_names)}"
+        return f"{random.choice(_FIRST_NAMES)}.{random.choice(_LAST_NAMES)}"
+    
+    def generate_random_names(self, count):
+        """Generate several random names with one draw per name list"""
+        firsts = random.choices(_FIRST_NAMES, k=count)
+        lasts = random.choices(_LAST_NAMES, k=count)
+        return [f"{first}.{last}" for first, last in zip(firsts, lasts)]
     
     def generate_password(self, length=16):
         """Generate a secure random password"""
-        characters = string.ascii_letters + string.digits + "!@#$%^&*"
-        password = ''.join(random.choice(characters) for _ in range(length))
+        buf = bytearray(secrets.choice(_PW_ALPHA) for _ in range(length))
         
         # Ensure at least one of each type
-        password = (
-            random.choice(string.ascii_lowercase) +
-            random.choice(string.ascii_uppercase) +
-            random.choice(string.digits) +
-            random.choice("!@#$%^&*") +
-            password[4:]
-        )
+        buf[0] = secrets.choice(_PW_LOWER)
+        buf[1] = secrets.choice(_PW_UPPER)
+        buf[2] = secrets.choice(_PW_DIGITS)
+        buf[3] = secrets.choice(_PW_SPECIALS)
         
-        return ''.join(random.sample(password, len(password)))
+        _sysrand.shuffle(buf)
+        return buf.decode('ascii')
     
     def create_email_accounts(self):
         """Create email accounts for each domain"""
         log("\n🔧 Creating email accounts...")
         
+        # Draw every username up front instead of one at a time
+        usernames = iter(self.generate_random_names(3 * len(self.domains)))
+        
         for domain in self.domains:
             log(f"\n📧 Processing domain: {domain}")
             
@@ -461,37 +749,31 @@ class EnhancedEmailConfigurator:
             # Get SMTP configuration for this domain
             smtp_config = self.smtp_configs.get(domain, self.smtp_configs.get('default', {}))
             
+            # Format SMTP/IMAP settings once per domain
+            smtp_template = {
+                'host': smtp_config.get('smtp_host', 'mail.{domain}').format(domain=domain),
+                'port': smtp_config.get('smtp_port', 587),
+                'security': smtp_config.get('smtp_security', 'STARTTLS')
+            }
+            imap_template = {
+                'host': smtp_config.get('imap_host', 'mail.{domain}').format(domain=domain),
+                'port': smtp_config.get('imap_port', 993),
+                'security': smtp_config.get('imap_security', 'SSL')
+            }
+            
             for i in range(3):  # 3 emails per domain
                 # Generate account details
-                username = self.generate_random_name()
+                username = next(usernames)
                 email = f"{username}@{domain}"
                 password = self.generate_password()
                 
-                # Format SMTP settings
-                smtp_host = smtp_config.get('smtp_host', 'mail.{domain}').format(domain=domain)
-                smtp_port = smtp_config.get('smtp_port', 587)
-                imap_host = smtp_config.get('imap_host', 'mail.{domain}').format(domain=domain)
-                imap_port = smtp_config.get('imap_port', 993)
-                
                 account = {
                     'email': email,
                     'username': username,
                     'password': password,
                     'domain': domain,
-                    'smtp_settings': {
-                        'host': smtp_host,
-                        'port': smtp_port,
-                        'security': smtp_config.get('smtp_security', 'STARTTLS'),
-                        'username': email,
-                        'password': password
-                    },
-                    'imap_settings': {
-                        'host': imap_host,
-                        'port': imap_port,
-                        'security': smtp_config.get('imap_security', 'SSL'),
-                        'username': email,
-                        'password': password
-                    }
+                    'smtp_settings': {**smtp_template, 'username': email, 'password': password},
+                    'imap_settings': {**imap_template, 'username': email, 'password': password}
                 }
                 
                 domain_accounts.append(account)
@@ -501,8 +783,13 @@ class EnhancedEmailConfigurator:
         
         return self.email_accounts
     
-    def generate_output_files(self):
-        """Generate output files with all credentials and configurations"""
+    def generate_output_files(self, compact=False):
+        """
+        Generate output files with all credentials and configurations
+        
+        Args:
+            compact (bool): Write the JSON without whitespace, gzip-compressed
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         # Create output directory
@@ -510,6 +797,7 @@ class EnhancedEmailConfigurator:
         output_dir.mkdir(exist_ok=True)
         
         # Generate JSON output
+        domain_set = set(self.domains)
         json_output = {
             'timestamp': timestamp,
             'server_ip': self.server_ip,
@@ -518,57 +806,83 @@ class EnhancedEmailConfigurator:
             'accounts': self.email_accounts,
             'dns_analysis': {
                 domain: {
-                    'provider': self.dns_managers[domain].dns_provider,
-                    'conflicts': self.dns_managers[domain].conflicts,
-                    'current_mx': self.dns_managers[domain].current_mx
+                    'provider': dns_manager.dns_provider,
+                    'conflicts': dns_manager.conflicts,
+                    'current_mx': dns_manager.current_mx
                 }
-                for domain in self.domains if domain in self.dns_managers
+                for domain, dns_manager in self.dns_managers.items() if domain in domain_set
             }
         }
         
-        json_file = output_dir / "email_credentials.json"
-        with open(json_file, 'w') as f:
-            json.dump(json_output, f, indent=2)
-        
-        # Generate CSV output
-        csv_file = output_dir / "email_credentials.csv"
-        with open(csv_file, 'w') as f:
-            f.write("Domain,Email,Username,Password,SMTP_Host,SMTP_Port,SMTP_Security,IMAP_Host,IMAP_Port,IMAP_Security\n")
-            for account in self.email_accounts:
-                f.write(f"{account['domain']},{account['email']},{account['username']},{account['password']},"
-                       f"{account['smtp_settings']['host']},{account['smtp_settings']['port']},{account['smtp_settings']['security']},"
-                       f"{account['imap_settings']['host']},{account['imap_settings']['port']},{account['imap_settings']['security']}\n")
-        
-        # Generate DNS instructions file
-        dns_file = output_dir / "dns_instructions.txt"
-        with open(dns_file, 'w') as f:
-            f.write("DNS CONFIGURATION INSTRUCTIONS\n")
-            f.write("=" * 50 + "\n\n")
-            f.write(f"Server IP: {self.server_ip}\n")
-            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            for domain in self.domains:
-                dns_manager = self.dns_managers.get(domain)
-                if not dns_manager:
-                    continue
-                    
-                f.write(f"\nDOMAIN: {domain}\n")
-                f.write("-" * 30 + "\n")
-                f.write(f"DNS Provider: {dns_manager.dns_provider}\n")
-                
-                if dns_manager.conflicts:
-                    f.write(f"\n⚠️  CONFLICTS DETECTED:\n")
-                    for conflict in dns_manager.conflicts:
-                        f.write(f"  - {conflict['description']}\n")
-                        f.write(f"    Solution: {conflict['solution']}\n")
+        # The three writers share no mutable state, so run them side by side
+        def write_json():
+            if compact:
+                # Stream the encoder output so large account lists are never held as one string
+                json_file = output_dir / "email_credentials.json.gz"
+                encoder = json.JSONEncoder(separators=(',', ':'))
+                with gzip.open(json_file, 'wt', encoding='utf-8') as f:
+                    for chunk in encoder.iterencode(json_output):
+                        f.write(chunk)
+            elif orjson is not None:
+                json_file = output_dir / "email_credentials.json"
+                with open(json_file, 'wb') as f:
+                    f.write(orjson.dumps(json_output, option=orjson.OPT_INDENT_2))
+            else:
+                json_file = output_dir / "email_credentials.json"
+                with open(json_file, 'w') as f:
+                    json.dump(json_output, f, indent=2)
+            return json_file
+        
+        def write_csv():
+            csv_file = output_dir / "email_credentials.csv"
+            with open(csv_file, 'w', newline='', buffering=1 << 20) as f:
+                writer = csv.writer(f, lineterminator='\n')
+                writer.writerow(CSV_HEADER)
+                writer.writerows(
+                    (
+                        account['domain'], account['email'], account['username'], account['password'],
+                        account['smtp_settings']['host'], account['smtp_settings']['port'], account['smtp_settings']['security'],
+                        account['imap_settings']['host'], account['imap_settings']['port'], account['imap_settings']['security']
+                    )
+                    for account in self.email_accounts
+                )
+            return csv_file
+        
+        def write_dns():
+            dns_file = output_dir / "dns_instructions.txt"
+            with open(dns_file, 'w') as f:
+                f.write("DNS CONFIGURATION INSTRUCTIONS\n")
+                f.write("=" * 50 + "\n\n")
+                f.write(f"Server IP: {self.server_ip}\n")
+                f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
                 
-                f.write(f"\nRequired DNS Records:\n")
-                suggestions = dns_manager.suggest_dns_configuration(self.server_ip)
-                for record in suggestions['required_records']:
-                    if record['type'] == 'MX':
-                        f.write(f"  {record['type']} {record['name']} → {record['value']} (priority {record['priority']})\n")
-                    else:
-                        f.write(f"  {record['type']} {record['name']} → {record['value']}\n")
+                for domain in self.domains:
+                    dns_manager = self.dns_managers.get(domain)
+                    if not dns_manager:
+                        continue
+                    
+                    f.write(f"\nDOMAIN: {domain}\n")
+                    f.write("-" * 30 + "\n")
+                    f.write(f"DNS Provider: {dns_manager.dns_provider}\n")
+                    
+                    if dns_manager.conflicts:
+                        f.write(f"\n⚠️  CONFLICTS DETECTED:\n")
+                        for conflict in dns_manager.conflicts:
+                            f.write(f"  - {conflict['description']}\n")
+                            f.write(f"    Solution: {conflict['solution']}\n")
+                    
+                    f.write(f"\nRequired DNS Records:\n")
+                    suggestions = dns_manager.suggest_dns_configuration(self.server_ip)
+                    for record in suggestions['required_records']:
+                        if record['type'] == 'MX':
+                            f.write(f"  {record['type']} {record['name']} → {record['value']} (priority {record['priority']})\n")
+                        else:
+                            f.write(f"  {record['type']} {record['name']} → {record['value']}\n")
+            return dns_file
+        
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(writer) for writer in (write_json, write_csv, write_dns)]
+            json_file, csv_file, dns_file = [future.result() for future in futures]
         
         log(f"\n📄 Output files generated in: {output_dir}")
         log(f"  - JSON: {json_file}")
@@ -629,6 +943,10 @@ class EnhancedEmailConfigurator:
         log("EMAIL CONFIGURATION SUMMARY")
         log("=" * 60)
         
+        by_domain = {}
+        for account in self.email_accounts:
+            by_domain.setdefault(account['domain'], []).append(account)
+        
         for domain in self.domains:
             log(f"\n📧 Domain: {domain}")
             
@@ -642,8 +960,7 @@ class EnhancedEmailConfigurator:
                     log(f"  ✅ No conflicts detected")
             
             # Email accounts
-            domain_accounts = [acc for acc in self.email_accounts if acc['domain'] == domain]
-            for account in domain_accounts:
+            for account in by_domain.get(domain, []):
                 log(f"  ✓ {account['email']} | Password: {account['password']}")
                 log(f"    SMTP: {account['smtp_settings']['host']}:{account['smtp_settings']['port']}")
 
@@ -659,8 +976,7 @@ def main():
 
 def error(message):
     """Error logging function"""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    print(f"[{timestamp}] ❌ {message}")
+    _emit("❌ ", message)
 
 if __name__ == "__main__":
     main()
@@ -4,52 +4,183 @@ Email Server Health Monitoring Script
 Monitors email server health and sends alerts
 """
 
+import os
 import json
+import math
 import time
 import smtplib
 import imaplib
 import subprocess
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import errno
+import selectors
 import socket
+import ssl
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from datetime import datetime
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Upper bound in seconds for a single SMTP/IMAP probe
+PROBE_TIMEOUT = 15
+
+# Headroom on top of the probe timeouts for the local checks and collection
+DEADLINE_SLACK = 5
+
+# Ports that speak TLS from the first byte (HTTPS, SMTPS, IMAPS)
+SSL_PORTS = (443, 465, 993)
+
+# How long a probed certificate's expiry is trusted before re-probing
+CERT_CACHE_TTL = 24 * 3600
+
+# certbot keeps one directory per issued certificate here
+LETSENCRYPT_LIVE = Path("/etc/letsencrypt/live")
+
 class EmailServerMonitor:
     def __init__(self, config_file="/opt/email-automation/monitor_config.json"):
         """Initialize the monitor with configuration"""
         self.config = self.load_config(config_file)
+        self.hostname = socket.gethostname()
+        
+        self._svc_names = self.config['services']
+        self._port_numbers = self.config['ports']
         self.status = {}
         self.alerts = []
         
+        self._evaluate = self._compile_evaluator(self.config['thresholds'])
+        
+        # Cap concurrent SMTP/IMAP logins overall and per mail host; the
+        # per-host semaphores are created up front so probe threads only read
+        thresholds = self.config['thresholds']
+        accounts = self.config['test_accounts']
+        max_per_domain = thresholds.get('max_per_domain', 8)
+        self._global_sem = threading.Semaphore(thresholds.get('max_concurrency', 50))
+        self._host_sems = {
+            host: threading.Semaphore(max_per_domain)
+            for account in accounts
+            for host in (account['smtp_host'], account['imap_host'])
+        }
+        
+        # A probe can queue for a worker or a semaphore before it starts, so
+        # the deadline must cover one probe timeout per round of queueing
+        total_probes = 2 * len(accounts) + 5
+        self._workers = min(32, total_probes)
+        host_probes = Counter(a['smtp_host'] for a in accounts)
+        host_probes.update(a['imap_host'] for a in accounts)
+        rounds = max(
+            math.ceil(total_probes / self._workers),
+            math.ceil(2 * len(accounts) / thresholds.get('max_concurrency', 50)),
+            max((math.ceil(n / max_per_domain) for n in host_probes.values()), default=1)
+        )
+        min_deadline = PROBE_TIMEOUT * rounds + DEADLINE_SLACK
+        self._deadline = self.config['global_deadline'] or min_deadline
+        if self._deadline < min_deadline:
+            self.log(f"global_deadline {self._deadline}s is too short for {total_probes} probes, "
+                     f"using {min_deadline}s", "WARNING")
+            self._deadline = min_deadline
+        
+        # Webhook connection kept alive for the life of the monitor
+        self._http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=2,
+            # Alerts are not idempotent: retry only when the request never
+            # reached the server or was explicitly refused, never on read errors
+            max_retries=Retry(
+                total=2,
+                read=0,
+                backoff_factor=0.3,
+                status_forcelist=[429, 503],
+                allowed_methods=frozenset({'POST'}),
+                raise_on_status=False
+            )
+        )
+        self._http.mount('https://', adapter)
+        self._http.mount('http://', adapter)
+        
+        # Probe workers, kept for the life of the monitor
+        self._executor = None
+        
+        # (host, port) -> (checked_at, notAfter as epoch seconds)
+        self._cert_cache = {}
+        
+        # Report files on disk, oldest first; filled from the directory once
+        self._reports = None
+        
+        self.ssl_host = self.config.get('ssl_host') or self._default_ssl_host()
+        if not self.ssl_host:
+            self.log("No ssl_host configured and no Let's Encrypt certificate found, "
+                     "SSL certificate checks are disabled", "WARNING")
+        
     def load_config(self, config_file):
         """Load monitoring configuration"""
         default_config = {
             "check_interval": 300,  # 5 minutes
+            "max_interval": 1800,  # ceiling while the server stays healthy
+            "global_deadline": 0,  # seconds a whole health check may take; 0 derives it from the probe count
             "webhook_url": "",
             "alert_email": "",
             "thresholds": {
                 "disk_usage": 90,
                 "memory_usage": 90,
                 "load_average": 5.0,
-                "queue_size": 100
+                "queue_size": 100,
+                "ssl_expiry_days": 14,
+                "max_concurrency": 50,
+                "max_per_domain": 8
             },
             "services": ["postfix", "dovecot", "mysql", "nginx"],
             "ports": [25, 587, 993, 443, 80],
+            "ssl_host": "",  # mail hostname on the certificate; defaults to the Let's Encrypt certificate's name
             "test_accounts": []
         }
         
         try:
             with open(config_file, 'r') as f:
                 config = json.load(f)
-                # Merge with defaults
-                for key, value in default_config.items():
-                    if key not in config:
-                        config[key] = value
-                return config
+            # Merge with defaults
+            for key, value in default_config.items():
+                if key not in config:
+                    config[key] = value
+            return config
         except FileNotFoundError:
             print(f"Config file not found, using defaults: {config_file}")
             return default_config
     
+    @staticmethod
+    def _compile_evaluator(thresholds):
+        """Build a resource/queue threshold check with the limits bound as locals"""
+        def evaluate(resources, queue, append,
+                     _disk=thresholds['disk_usage'],
+                     _memory=thresholds['memory_usage'],
+                     _load=thresholds['load_average'],
+                     _queue=thresholds['queue_size']):
+            du = resources.get('disk_usage')
+            if du is not None and du > _disk:
+                append(f"High disk usage: {du}%")
+            
+            mu = resources.get('memory_usage')
+            if mu is not None and mu > _memory:
+                append(f"High memory usage: {mu}%")
+            
+            la = resources.get('load_average')
+            if la is not None and la > _load:
+                append(f"High load average: {la}")
+            
+            if queue is not None and queue > _queue:
+                append(f"Large mail queue: {queue} messages")
+        
+        return evaluate
+    
     def log(self, message, level="INFO"):
         """Log a message with timestamp"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -69,6 +200,23 @@ class EmailServerMonitor:
             self.log(f"Error checking service {service}: {e}", "ERROR")
             return False
     
+    def check_services_bulk(self):
+        """Check all configured systemd services with a single systemctl call"""
+        state = [False] * len(self._svc_names)
+        try:
+            result = subprocess.run(
+                ["systemctl", "is-active", *self._svc_names],
+                capture_output=True,
+                text=True,
+                timeout=10
+            )
+            lines = result.stdout.split('\n')
+            for i in range(len(state)):
+                state[i] = i < len(lines) and lines[i] == "active"
+        except Exception as e:
+            self.log(f"Error checking services: {e}", "ERROR")
+        return state
+    
     def check_port_connectivity(self, port, host="localhost"):
         """Check if a port is accessible"""
         try:
@@ -81,38 +229,72 @@ class EmailServerMonitor:
             self.log(f"Error checking port {port}: {e}", "ERROR")
             return False
     
+    def check_ports_bulk(self, host="localhost", timeout=5):
+        """Check all configured ports at once with non-blocking connects"""
+        state = [False] * len(self._port_numbers)
+        try:
+            addr = socket.gethostbyname(host)
+        except OSError as e:
+            self.log(f"Error resolving {host}: {e}", "ERROR")
+            return state
+        
+        with selectors.DefaultSelector() as sel:
+            for i, port in enumerate(self._port_numbers):
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.setblocking(False)
+                result = sock.connect_ex((addr, port))
+                if result == errno.EINPROGRESS:
+                    sel.register(sock, selectors.EVENT_WRITE, i)
+                else:
+                    state[i] = result == 0
+                    sock.close()
+            
+            deadline = time.monotonic() + timeout
+            while sel.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                for key, _ in sel.select(timeout=remaining):
+                    sock = key.fileobj
+                    state[key.data] = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0
+                    sel.unregister(sock)
+                    sock.close()
+            
+            # Whatever is still pending timed out
+            for key in list(sel.get_map().values()):
+                sel.unregister(key.fileobj)
+                key.fileobj.close()
+        
+        return state
+    
     def check_system_resources(self):
         """Check system resource usage"""
         resources = {}
         
         try:
-            # Check disk usage
-            result = subprocess.run(
-                ["df", "-h", "/"],
-                capture_output=True,
-                text=True
-            )
-            lines = result.stdout.strip().split('\n')
-            if len(lines) > 1:
-                parts = lines[1].split()
-                if len(parts) >= 5:
-                    usage_percent = int(parts[4].rstrip('%'))
-                    resources['disk_usage'] = usage_percent
+            # Check disk usage (same rounding as df's Use% column)
+            st = os.statvfs('/')
+            used = st.f_blocks - st.f_bfree
+            if used + st.f_bavail:
+                resources['disk_usage'] = -(-used * 100 // (used + st.f_bavail))
             
             # Check memory usage
             with open('/proc/meminfo', 'r') as f:
                 meminfo = f.read()
             
-            mem_total = int([line for line in meminfo.split('\n') if 'MemTotal:' in line][0].split()[1])
-            mem_available = int([line for line in meminfo.split('\n') if 'MemAvailable:' in line][0].split()[1])
+            mem = {}
+            for line in meminfo.splitlines():
+                key, _, rest = line.partition(':')
+                if key in ('MemTotal', 'MemAvailable'):
+                    mem[key] = int(rest.split()[0])
+                    if len(mem) == 2:
+                        break
             
-            mem_used_percent = int(((mem_total - mem_available) / mem_total) * 100)
+            mem_used_percent = int(((mem['MemTotal'] - mem['MemAvailable']) / mem['MemTotal']) * 100)
             resources['memory_usage'] = mem_used_percent
             
             # Check load average
-            with open('/proc/loadavg', 'r') as f:
-                load_avg = float(f.read().split()[0])
-            resources['load_average'] = load_avg
+            resources['load_average'] = round(os.getloadavg()[0], 2)
             
         except Exception as e:
             self.log(f"Error checking system resources: {e}", "ERROR")
@@ -122,19 +304,30 @@ class EmailServerMonitor:
     def check_mail_queue(self):
         """Check mail queue size"""
         try:
+            # postqueue -j prints one JSON object per queued message
+            with subprocess.Popen(
+                ["postqueue", "-j"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            ) as proc:
+                queue_count = sum(1 for _ in proc.stdout)
+            if proc.returncode == 0:
+                return queue_count
+            
+            # Postfix older than 3.1 has no -j; read the summary line of -p instead
             result = subprocess.run(
                 ["postqueue", "-p"],
                 capture_output=True,
                 text=True
             )
-            
-            lines = result.stdout.strip().split('\n')
-            if lines and "Mail queue is empty" in lines[-1]:
+            last_line = result.stdout.rstrip().rpartition('\n')[2]
+            if "Mail queue is empty" in last_line:
                 return 0
-            else:
-                # Count queued messages
-                queue_count = len([line for line in lines if line and not line.startswith('-') and not line.startswith('Mail')])
-                return max(0, queue_count - 1)  # Subtract header line
+            # "-- 12 Kbytes in 3 Requests."
+            parts = last_line.split()
+            if last_line.startswith('--') and len(parts) >= 5:
+                return int(parts[4])
+            return 0
                 
         except Exception as e:
             self.log(f"Error checking mail queue: {e}", "ERROR")
@@ -143,10 +336,11 @@ class EmailServerMonitor:
     def test_smtp_connectivity(self, account):
         """Test SMTP connectivity for an account"""
         try:
-            server = smtplib.SMTP(account['smtp_host'], account['smtp_port'])
-            server.starttls()
-            server.login(account['email'], account['password'])
-            server.quit()
+            with self._global_sem, self._host_sems[account['smtp_host']]:
+                server = smtplib.SMTP(account['smtp_host'], account['smtp_port'], timeout=PROBE_TIMEOUT)
+                server.starttls()
+                server.login(account['email'], account['password'])
+                server.quit()
             return True
         except Exception as e:
             self.log(f"SMTP test failed for {account['email']}: {e}", "ERROR")
@@ -155,47 +349,81 @@ class EmailServerMonitor:
     def test_imap_connectivity(self, account):
         """Test IMAP connectivity for an account"""
         try:
-            mail = imaplib.IMAP4_SSL(account['imap_host'], account['imap_port'])
-            mail.login(account['email'], account['password'])
-            mail.logout()
+            with self._global_sem, self._host_sems[account['imap_host']]:
+                mail = imaplib.IMAP4_SSL(account['imap_host'], account['imap_port'], timeout=PROBE_TIMEOUT)
+                mail.login(account['email'], account['password'])
+                mail.logout()
             return True
         except Exception as e:
             self.log(f"IMAP test failed for {account['email']}: {e}", "ERROR")
             return False
     
-    def check_ssl_certificates(self):
-        """Check SSL certificate expiration"""
-        cert_status = {}
-        
+    def close(self):
+        """Drop the webhook connection and stop probe workers"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._http.close()
+    
+    @staticmethod
+    def _default_ssl_host():
+        """Name of the certificate certbot issued on this server, or None"""
         try:
-            # Check Let's Encrypt certificates
-            result = subprocess.run(
-                ["certbot", "certificates"],
-                capture_output=True,
-                text=True
-            )
+            names = sorted(p.name for p in LETSENCRYPT_LIVE.iterdir() if p.is_dir())
+        except OSError:
+            return None
+        return names[0] if names else None
+    
+    def check_ssl_certificates(self, force=False):
+        """Check SSL certificate expiration on the TLS ports being monitored"""
+        host = self.ssl_host
+        if not host:
+            return {'ssl_valid': None, 'ssl_configured': False}
+        now = time.time()
+        expiries = {}
+        cert_status = {'ssl_valid': True}
+        
+        for port in self.config['ports']:
+            if port not in SSL_PORTS:
+                continue
             
-            output = result.stdout
-            if "VALID" in output:
-                cert_status['ssl_valid'] = True
-                # Extract expiration date if needed
-                cert_status['ssl_expires'] = "Valid"
+            cached = self._cert_cache.get((host, port))
+            if cached and not force and now - cached[0] < CERT_CACHE_TTL:
+                not_after = cached[1]
             else:
+                try:
+                    not_after = self._probe_certificate(host, port)
+                except Exception as e:
+                    self.log(f"Error checking SSL certificate on {host}:{port}: {e}", "ERROR")
+                    cert_status['ssl_valid'] = False
+                    continue
+                self._cert_cache[(host, port)] = (now, not_after)
+            
+            expiries[port] = not_after
+            if not_after <= now:
                 cert_status['ssl_valid'] = False
-                cert_status['ssl_expires'] = "Invalid or Expired"
-                
-        except Exception as e:
-            self.log(f"Error checking SSL certificates: {e}", "ERROR")
-            cert_status['ssl_valid'] = False
+        
+        if expiries:
+            first_expiry = min(expiries.values())
+            cert_status['ssl_expires'] = datetime.fromtimestamp(first_expiry).strftime("%Y-%m-%d")
+            cert_status['ssl_days_left'] = int((first_expiry - now) // 86400)
         
         return cert_status
     
+    def _probe_certificate(self, host, port):
+        """Return the notAfter time of the certificate served on host:port"""
+        context = ssl.create_default_context()
+        with socket.create_connection((host, port), timeout=5) as sock:
+            with context.wrap_socket(sock, server_hostname=host) as ssock:
+                cert = ssock.getpeercert()
+        return ssl.cert_time_to_seconds(cert['notAfter'])
+    
     def run_health_check(self):
         """Run comprehensive health check"""
         self.log("Starting health check...")
         self.status = {
             'timestamp': datetime.now().isoformat(),
-            'hostname': subprocess.run(['hostname'], capture_output=True, text=True).stdout.strip(),
+            'hostname': self.hostname,
             'services': {},
             'ports': {},
             'resources': {},
@@ -205,57 +433,89 @@ class EmailServerMonitor:
             'overall_status': 'healthy'
         }
         
+        services = self._svc_names
+        ports = self._port_numbers
+        accounts = self.config['test_accounts']
+        
+        # Every probe is blocking I/O, so run them all at once. Probes still
+        # running at the deadline are reported as unknown (None). Probes only
+        # return results; shared state is written here, so a straggler from
+        # this check cannot overwrite the next check's results.
+        results = {}
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers)
+        executor = self._executor
+        futures = {executor.submit(self.check_services_bulk): ('services', None)}
+        futures[executor.submit(self.check_ports_bulk)] = ('ports', None)
+        futures[executor.submit(self.check_system_resources)] = ('resources', None)
+        futures[executor.submit(self.check_mail_queue)] = ('mail_queue', None)
+        futures[executor.submit(self.check_ssl_certificates)] = ('ssl', None)
+        for account in accounts:
+            futures[executor.submit(self.test_smtp_connectivity, account)] = ('smtp', account['email'])
+            futures[executor.submit(self.test_imap_connectivity, account)] = ('imap', account['email'])
+        
+        try:
+            for future in as_completed(futures, timeout=self._deadline):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    self.log(f"Probe {futures[future]} failed: {e}", "ERROR")
+        except FuturesTimeoutError:
+            for future, (kind, target) in futures.items():
+                if not future.done():
+                    results[(kind, target)] = None
+                    probe = kind if target is None else f"{kind} {target}"
+                    self.alerts.append(f"{probe} exceeded deadline")
+                    # Free the worker slot if the probe never started
+                    future.cancel()
+        
+        append = self.alerts.append
+        
         # Check services
-        for service in self.config['services']:
-            self.status['services'][service] = self.check_service_status(service)
-            if not self.status['services'][service]:
-                self.alerts.append(f"Service {service} is not running")
+        svc_state = results.get(('services', None)) or [None] * len(services)
+        for service, active in zip(services, svc_state):
+            if active is False:
+                append(f"Service {service} is not running")
+        self.status['services'] = dict(zip(services, svc_state))
         
         # Check ports
-        for port in self.config['ports']:
-            self.status['ports'][port] = self.check_port_connectivity(port)
-            if not self.status['ports'][port]:
-                self.alerts.append(f"Port {port} is not accessible")
+        port_state = results.get(('ports', None)) or [None] * len(ports)
+        for port, is_open in zip(ports, port_state):
+            if is_open is False:
+                append(f"Port {port} is not accessible")
+        self.status['ports'] = dict(zip(ports, port_state))
         
         # Check system resources
-        self.status['resources'] = self.check_system_resources()
+        resources = self.status['resources'] = results.get(('resources', None)) or {}
         
         # Check thresholds
         thresholds = self.config['thresholds']
-        resources = self.status['resources']
-        
-        if resources.get('disk_usage', 0) > thresholds['disk_usage']:
-            self.alerts.append(f"High disk usage: {resources['disk_usage']}%")
-        
-        if resources.get('memory_usage', 0) > thresholds['memory_usage']:
-            self.alerts.append(f"High memory usage: {resources['memory_usage']}%")
-        
-        if resources.get('load_average', 0) > thresholds['load_average']:
-            self.alerts.append(f"High load average: {resources['load_average']}")
-        
-        # Check mail queue
-        self.status['mail_queue'] = self.check_mail_queue()
-        if self.status['mail_queue'] > thresholds['queue_size']:
-            self.alerts.append(f"Large mail queue: {self.status['mail_queue']} messages")
+        queue = self.status['mail_queue'] = results.get(('mail_queue', None), -1)
+        self._evaluate(resources, queue, append)
         
         # Check SSL certificates
-        self.status['ssl_status'] = self.check_ssl_certificates()
-        if not self.status['ssl_status'].get('ssl_valid', False):
-            self.alerts.append("SSL certificate issues detected")
+        ssl_status = self.status['ssl_status'] = results.get(('ssl', None)) or {'ssl_valid': None}
+        days_left = ssl_status.get('ssl_days_left')
+        if ssl_status.get('ssl_configured') is False:
+            append("SSL certificate check not configured (set ssl_host)")
+        elif ssl_status.get('ssl_valid', False) is False:
+            append("SSL certificate issues detected")
+        elif days_left is not None and days_left < thresholds.get('ssl_expiry_days', 14):
+            append(f"SSL certificate expires in {days_left} days")
         
         # Test email connectivity
-        for account in self.config['test_accounts']:
+        email_tests = self.status['email_tests']
+        for account in accounts:
             email = account['email']
-            self.status['email_tests'][email] = {
-                'smtp': self.test_smtp_connectivity(account),
-                'imap': self.test_imap_connectivity(account)
-            }
+            smtp_ok = results.get(('smtp', email), False)
+            imap_ok = results.get(('imap', email), False)
+            email_tests[email] = {'smtp': smtp_ok, 'imap': imap_ok}
             
-            if not self.status['email_tests'][email]['smtp']:
-                self.alerts.append(f"SMTP test failed for {email}")
+            if smtp_ok is False:
+                append(f"SMTP test failed for {email}")
             
-            if not self.status['email_tests'][email]['imap']:
-                self.alerts.append(f"IMAP test failed for {email}")
+            if imap_ok is False:
+                append(f"IMAP test failed for {email}")
         
         # Determine overall status
         if self.alerts:
@@ -299,16 +559,40 @@ class EmailServerMonitor:
                 'icon_emoji': emoji
             }
             
-            response = requests.post(
-                self.config['webhook_url'],
-                json=payload,
-                timeout=10
-            )
+            # Only the status code is needed, so the body is never read or decoded
+            if orjson is not None:
+                response = self._http.post(
+                    self.config['webhook_url'],
+                    data=orjson.dumps(payload),
+                    headers={'Content-Type': 'application/json', 'Accept-Encoding': 'identity'},
+                    timeout=10,
+                    stream=True
+                )
+            else:
+                response = self._http.post(
+                    self.config['webhook_url'],
+                    json=payload,
+                    headers={'Accept-Encoding': 'identity'},
+                    timeout=10,
+                    stream=True
+                )
+            try:
+                status_code = response.status_code
+                # Short acks like "ok" are read off so the connection can be
+                # reused; anything larger is dropped along with the connection
+                try:
+                    body_length = int(response.headers.get('Content-Length', -1))
+                except ValueError:
+                    body_length = -1
+                if 0 <= body_length <= 1024:
+                    response.raw.drain_conn()
+            finally:
+                response.close()
             
-            if response.status_code == 200:
+            if status_code == 200:
                 self.log("Webhook notification sent successfully")
             else:
-                self.log(f"Webhook notification failed: {response.status_code}", "ERROR")
+                self.log(f"Webhook notification failed: {status_code}", "ERROR")
                 
         except Exception as e:
             self.log(f"Error sending webhook notification: {e}", "ERROR")
@@ -322,14 +606,21 @@ class EmailServerMonitor:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             report_file = report_dir / f"health_report_{timestamp}.json"
             
-            with open(report_file, 'w') as f:
-                json.dump(status, f, indent=2)
+            if self._reports is None:
+                self._reports = deque(sorted(report_dir.glob("health_report_*.json")))
+            
+            if orjson is not None:
+                # Port numbers are int keys in status['ports']
+                report_file.write_bytes(orjson.dumps(status, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            else:
+                with open(report_file, 'w') as f:
+                    json.dump(status, f, indent=2)
             
             # Keep only last 100 reports
-            reports = sorted(report_dir.glob("health_report_*.json"))
-            if len(reports) > 100:
-                for old_report in reports[:-100]:
-                    old_report.unlink()
+            if not self._reports or self._reports[-1] != report_file:
+                self._reports.append(report_file)
+            while len(self._reports) > 100:
+                self._reports.popleft().unlink(missing_ok=True)
             
             self.log(f"Health report saved: {report_file}")
             
@@ -339,6 +630,7 @@ class EmailServerMonitor:
     def run_continuous_monitoring(self):
         """Run continuous monitoring loop"""
         self.log("Starting continuous email server monitoring...")
+        self._healthy_streak = 0
         
         while True:
             try:
@@ -355,11 +647,22 @@ class EmailServerMonitor:
                 if status['overall_status'] != 'healthy':
                     self.send_webhook_notification(status)
                 
-                # Wait for next check
-                time.sleep(self.config['check_interval'])
+                # Wait for next check, backing off while everything stays healthy
+                base_interval = self.config['check_interval']
+                if status['overall_status'] == 'healthy':
+                    interval = min(
+                        base_interval * 2 ** min(self._healthy_streak, 4),
+                        max(self.config['max_interval'], base_interval)
+                    )
+                    self._healthy_streak += 1
+                else:
+                    self._healthy_streak = 0
+                    interval = base_interval
+                time.sleep(interval)
                 
             except KeyboardInterrupt:
                 self.log("Monitoring stopped by user")
+                self.close()
                 break
             except Exception as e:
                 self.log(f"Error in monitoring loop: {e}", "ERROR")
@@ -413,6 +716,7 @@ def main():
             # Send notification
             monitor.send_webhook_notification(status)
             monitor.save_status_report(status)
+            monitor.close()
             
             # Exit with appropriate code
             exit_code = 0 if status['overall_status'] == 'healthy' else 1
@@ -0,0 +1,10 @@
+#!/usr/bin/env pypy3
+"""
+Email Server Health Monitoring Script (PyPy entry point)
+Runs monitor.py under the PyPy JIT for long-running monitoring loops
+"""
+
+from monitor import main
+
+if __name__ == "__main__":
+    main()
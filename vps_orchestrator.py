@@ -4,28 +4,89 @@ VPS Email Automation Orchestrator
 Automatise complètement le processus post-achat VPS pour configuration email
 """
 
+import os
+import base64
+import csv
+import io
 import json
 import time
 import subprocess
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import paramiko
+from passlib.hash import sha512_crypt
 import mysql.connector
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import secrets
+import select
+import shlex
+import socket
+import ssl
 import string
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DO_API = "https://api.digitalocean.com/v2"
+API_TIMEOUT = 30
+MYSQL_TIMEOUT = 30
+
+PASSWORD_ALPHABET = (string.ascii_letters + string.digits + "!@#$%^&*").encode()
+# Maps a random byte to a password character; bytes past the last full
+# multiple of the alphabet are dropped so every character is equally likely
+_PASSWORD_TABLE = bytes(PASSWORD_ALPHABET[b % len(PASSWORD_ALPHABET)] for b in range(256))
+_PASSWORD_REJECT = bytes(range(256 - 256 % len(PASSWORD_ALPHABET), 256))
+
+FIRST_NAMES = ('alex', 'jordan', 'morgan', 'casey', 'taylor', 'riley', 'sage', 'quinn')
+LAST_NAMES = ('smith', 'johnson', 'williams', 'brown', 'jones', 'garcia', 'miller')
 
 class VPSEmailOrchestrator:
+    # (type, name, content, ttl, priority) for every mail DNS record
+    _CF_TEMPLATES = (
+        ("A", "mail", "{ip}", 3600, None),
+        ("MX", "@", "mail.{domain}", 3600, 10),
+        ("TXT", "@", "v=spf1 mx a ip4:{ip} ~all", 3600, None),
+        ("TXT", "_dmarc", "v=DMARC1; p=quarantine; rua=mailto:dmarc@{domain}", 3600, None),
+        ("CNAME", "autoconfig", "mail.{domain}", 3600, None),
+        ("CNAME", "autodiscover", "mail.{domain}", 3600, None),
+    )
+    
     def __init__(self, config_file="automation_config.json"):
         """Initialize the orchestrator with configuration"""
         self.config = self.load_config(config_file)
         self.vps_ip = None
         self.ssh_client = None
+        self._sftp = None
+        self._sftp_lock = threading.Lock()
         self.email_accounts = []
+        self._dns_ready = None
+        
+        # One keep-alive session per provider API, with its auth header preset
+        self._http_do = self._api_session(self.config['vps_provider']['api_token'])
+        self._http_cf = self._api_session(self.config['dns_provider']['api_token'])
+    
+    def _api_session(self, api_token):
+        """HTTP session that sends the bearer token and retries transient failures"""
+        session = requests.Session()
+        session.headers["Authorization"] = f"Bearer {api_token}"
+        session.mount('https://', HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.3)
+        ))
+        return session
         
     def load_config(self, config_file):
         """Load configuration from JSON file"""
         try:
+            if orjson is not None:
+                return orjson.loads(Path(config_file).read_bytes())
             with open(config_file, 'r') as f:
                 return json.load(f)
         except FileNotFoundError:
@@ -72,8 +133,14 @@ class VPSEmailOrchestrator:
     
     def generate_secure_password(self, length=20):
         """Generate a secure password"""
-        alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
-        return ''.join(secrets.choice(alphabet) for _ in range(length))
+        return self._bulk_passwords(1, length)[0]
+    
+    def _bulk_passwords(self, count, length):
+        """Generate count passwords from one os.urandom draw"""
+        chars = bytearray()
+        while len(chars) < count * length:
+            chars += os.urandom((count * length - len(chars)) * 2).translate(_PASSWORD_TABLE, _PASSWORD_REJECT)
+        return [chars[i * length:(i + 1) * length].decode() for i in range(count)]
     
     def provision_vps(self):
         """Provision VPS automatically via API"""
@@ -90,8 +157,6 @@ class VPSEmailOrchestrator:
     
     def provision_digitalocean(self):
         """Provision DigitalOcean droplet"""
-        api_token = self.config['vps_provider']['api_token']
-        
         # Generate cloud-init script
         user_data = self.generate_cloud_init_script()
         
@@ -106,23 +171,19 @@ class VPSEmailOrchestrator:
             "tags": ["email-server", "automated"]
         }
         
-        headers = {
-            "Authorization": f"Bearer {api_token}",
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.post(
-            "https://api.digitalocean.com/v2/droplets",
-            headers=headers,
-            json=payload
+        response = self._http_do.post(
+            f"{DO_API}/droplets",
+            json=payload,
+            timeout=API_TIMEOUT
         )
         
         if response.status_code == 202:
             droplet_data = response.json()
             droplet_id = droplet_data['droplet']['id']
+            action_id = droplet_data['links']['actions'][0]['id']
             
             # Wait for droplet to be ready
-            self.vps_ip = self.wait_for_droplet_ready(droplet_id, api_token)
+            self.vps_ip = self.wait_for_droplet_ready(droplet_id, action_id)
             print(f"✅ VPS provisioned: {self.vps_ip}")
             return self.vps_ip
         else:
@@ -130,71 +191,96 @@ class VPSEmailOrchestrator:
     
     def generate_cloud_init_script(self):
         """Generate cloud-init script for initial server setup"""
-        mysql_root_pass = self.generate_secure_password()
-        mail_db_pass = self.generate_secure_password()
+        mysql_root_pass, mail_db_pass = self._bulk_passwords(2, 20)
         
         # Store passwords for later use
         self.config['server_settings']['mysql_root_password'] = mysql_root_pass
         self.config['server_settings']['mail_db_password'] = mail_db_pass
         
-        cloud_init = f"""#!/bin/bash
+        mysql_init = f"""ALTER USER 'root'@'localhost' IDENTIFIED WITH mysql_native_password BY '{mysql_root_pass}';
+CREATE DATABASE mailserver;
+CREATE USER 'mailuser'@'localhost' IDENTIFIED BY '{mail_db_pass}';
+GRANT ALL ON mailserver.* TO 'mailuser'@'localhost';
+FLUSH PRIVILEGES;
+"""
+        
+        # Ship the scripts inside user_data so first boot never waits on a download
+        configurator = Path(__file__).with_name('email_configurator.py').read_bytes()
+        
+        cloud_init = f"""#cloud-config
 # Automated VPS setup for email server
 
-export DEBIAN_FRONTEND=noninteractive
-
-# Update system
-apt-get update && apt-get upgrade -y
-
-# Install essential packages
-apt-get install -y \\
-    postfix postfix-mysql \\
-    dovecot-core dovecot-imapd dovecot-pop3d dovecot-lmtpd dovecot-mysql \\
-    mysql-server \\
-    nginx \\
-    certbot python3-certbot-nginx \\
-    fail2ban \\
-    ufw \\
-    python3-pip \\
-    git \\
-    htop \\
-    curl \\
-    wget
-
-# Configure MySQL
-mysql -e "ALTER USER 'root'@'localhost' IDENTIFIED WITH mysql_native_password BY '{mysql_root_pass}';"
-mysql -u root -p{mysql_root_pass} -e "CREATE DATABASE mailserver;"
-mysql -u root -p{mysql_root_pass} -e "CREATE USER 'mailuser'@'localhost' IDENTIFIED BY '{mail_db_pass}';"
-mysql -u root -p{mysql_root_pass} -e "GRANT ALL ON mailserver.* TO 'mailuser'@'localhost';"
-mysql -u root -p{mysql_root_pass} -e "FLUSH PRIVILEGES;"
+package_update: true
+package_upgrade: true
+packages:
+  - postfix
+  - postfix-mysql
+  - dovecot-core
+  - dovecot-imapd
+  - dovecot-pop3d
+  - dovecot-lmtpd
+  - dovecot-mysql
+  - mysql-server
+  - nginx
+  - certbot
+  - python3-certbot-nginx
+  - fail2ban
+  - ufw
+  - python3-pip
+  - git
+  - htop
+  - curl
+  - wget
 
-# Configure firewall
-ufw allow 22,25,53,80,110,143,443,465,587,993,995/tcp
-ufw --force enable
+write_files:
+  - path: /opt/email-automation/email_configurator.py
+    encoding: b64
+    content: {base64.b64encode(configurator).decode()}
+    permissions: '0755'
+  - path: /root/mail_init.sql
+    encoding: b64
+    content: {base64.b64encode(mysql_init.encode()).decode()}
+    permissions: '0600'
 
-# Create directory for email automation
-mkdir -p /opt/email-automation
-cd /opt/email-automation
-
-# Download automation scripts
-wget -O email_configurator.py https://raw.githubusercontent.com/your-repo/email-automation/main/email_configurator.py
-chmod +x email_configurator.py
-
-# Signal completion
-touch /tmp/cloud-init-complete
-echo "VPS setup completed at $(date)" > /tmp/setup-log.txt
+runcmd:
+  # Configure MySQL
+  - mysql < /root/mail_init.sql && rm -f /root/mail_init.sql
+  # Configure firewall
+  - ufw allow 22,25,53,80,110,143,443,465,587,993,995/tcp
+  - ufw --force enable
+  # Signal completion
+  - touch /tmp/cloud-init-complete
+  - echo "VPS setup completed at $(date)" > /tmp/setup-log.txt
 """
         return cloud_init
     
-    def wait_for_droplet_ready(self, droplet_id, api_token):
+    def wait_for_droplet_ready(self, droplet_id, action_id):
         """Wait for DigitalOcean droplet to be ready"""
-        headers = {"Authorization": f"Bearer {api_token}"}
-        
         print("⏳ Waiting for VPS to be ready...")
         
+        # The create action completes as soon as the droplet is up
+        delay = 2.0
         while True:
-            response = requests.get(
-                f"https://api.digitalocean.com/v2/droplets/{droplet_id}",
-                headers=headers
+            response = self._http_do.get(
+                f"{DO_API}/actions/{action_id}",
+                timeout=API_TIMEOUT
+            )
+            
+            if response.status_code == 200:
+                status = response.json()['action']['status']
+                if status == 'completed':
+                    break
+                if status == 'errored':
+                    raise Exception(f"Droplet creation failed (action {action_id})")
+            
+            time.sleep(delay)
+            delay = min(delay * 2, 8)
+        
+        delay = 2.0
+        while True:
+            response = self._http_do.get(
+                f"{DO_API}/droplets/{droplet_id}",
+                timeout=API_TIMEOUT
             )
             
             if response.status_code == 200:
@@ -210,23 +296,26 @@ echo "VPS setup completed at $(date)" > /tmp/setup-log.txt
                             if self.wait_for_ssh(ip):
                                 return ip
             
-            time.sleep(30)
+            time.sleep(delay)
+            delay = min(delay * 1.5, 30)
     
     def wait_for_ssh(self, ip, timeout=300):
         """Wait for SSH to be available"""
         print(f"⏳ Waiting for SSH on {ip}...")
         
+        # sshd sends its "SSH-2.0-..." banner right after accept, which is
+        # enough to know it is serving; connect_ssh does the real handshake
         start_time = time.time()
         while time.time() - start_time < timeout:
             try:
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                client.connect(ip, username='root', timeout=10)
-                client.close()
-                print("✅ SSH is ready")
-                return True
-            except:
-                time.sleep(10)
+                with socket.create_connection((ip, 22), timeout=2) as sock:
+                    sock.settimeout(5)
+                    if sock.recv(4) == b'SSH-':
+                        print("✅ SSH is ready")
+                        return True
+            except OSError:
+                pass
+            time.sleep(5)
         
         return False
     
@@ -234,8 +323,13 @@ echo "VPS setup completed at $(date)" > /tmp/setup-log.txt
         """Configure DNS records for all domains"""
         print("🌐 Configuring DNS records...")
         
-        for domain in self.config['domains']:
-            self.create_dns_records_for_domain(domain)
+        if self.config['dns_provider']['name'] == "cloudflare":
+            # Import every domain at once
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(self.create_cloudflare_dns_records, self.config['domains']))
+        else:
+            for domain in self.config['domains']:
+                self.create_dns_records_for_domain(domain)
         
         print("✅ DNS records configured")
     
@@ -250,44 +344,77 @@ echo "VPS setup completed at $(date)" > /tmp/setup-log.txt
     
     def create_cloudflare_dns_records(self, domain):
         """Create Cloudflare DNS records"""
-        api_token = self.config['dns_provider']['api_token']
+        records = self.cloudflare_records(domain)
+        
+        # One zone-file import instead of a request per record
+        response = self.import_cloudflare_records(domain, records)
+        if response.status_code == 200:
+            print(f"  ✓ Imported {len(records)} records for {domain}")
+            return
+        
+        if 400 <= response.status_code < 500:
+            print(f"  ⚠ Zone import rejected for {domain}, creating records one by one")
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(self.post_cloudflare_record, records))
+        else:
+            print(f"  ✗ Failed to import records for {domain}: {response.text}")
+    
+    def import_cloudflare_records(self, domain, records):
+        """Upload records to Cloudflare as a BIND zone file"""
         zone_id = self.config['dns_provider']['zone_id']
         
-        headers = {
-            "Authorization": f"Bearer {api_token}",
-            "Content-Type": "application/json"
+        lines = [f"$ORIGIN {domain}."]
+        for record in records:
+            content = record["content"]
+            if record["type"] == "TXT":
+                content = f'"{content}"'
+            elif record["type"] in ("MX", "CNAME"):
+                content = f"{content}."
+            if "priority" in record:
+                content = f"{record['priority']} {content}"
+            lines.append(f"{record['name']} {record['ttl']} IN {record['type']} {content}")
+        
+        return self._http_cf.post(
+            f"https://api.cloudflare.com/client/v4/zones/{zone_id}/dns_records/import",
+            files={"file": ("zone.txt", "\n".join(lines) + "\n")},
+            timeout=API_TIMEOUT
+        )
+    
+    def cloudflare_records(self, domain):
+        """DNS records needed by the mail server for a domain"""
+        ctx = {"ip": self.vps_ip, "domain": domain}
+        records = []
+        for record_type, name, content, ttl, priority in self._CF_TEMPLATES:
+            record = {"type": record_type, "name": name, "content": content.format_map(ctx), "ttl": ttl}
+            if priority is not None:
+                record["priority"] = priority
+            records.append(record)
+        return records
+    
+    def post_cloudflare_record(self, record):
+        """Create one Cloudflare DNS record"""
+        zone_id = self.config['dns_provider']['zone_id']
+        
+        payload = {
+            "type": record["type"],
+            "name": record["name"],
+            "content": record["content"],
+            "ttl": record["ttl"]
         }
         
-        records = [
-            {"type": "A", "name": "mail", "content": self.vps_ip, "ttl": 3600},
-            {"type": "MX", "name": "@", "content": f"mail.{domain}", "priority": 10},
-            {"type": "TXT", "name": "@", "content": f"v=spf1 mx a ip4:{self.vps_ip} ~all"},
-            {"type": "TXT", "name": "_dmarc", "content": f"v=DMARC1; p=quarantine; rua=mailto:dmarc@{domain}"},
-            {"type": "CNAME", "name": "autoconfig", "content": f"mail.{domain}"},
-            {"type": "CNAME", "name": "autodiscover", "content": f"mail.{domain}"}
-        ]
+        if "priority" in record:
+            payload["priority"] = record["priority"]
         
-        for record in records:
-            payload = {
-                "type": record["type"],
-                "name": record["name"],
-                "content": record["content"],
-                "ttl": record.get("ttl", 3600)
-            }
-            
-            if "priority" in record:
-                payload["priority"] = record["priority"]
-            
-            response = requests.post(
-                f"https://api.cloudflare.com/client/v4/zones/{zone_id}/dns_records",
-                headers=headers,
-                json=payload
-            )
-            
-            if response.status_code == 200:
-                print(f"  ✓ Created {record['type']} record for {record['name']}")
-            else:
-                print(f"  ✗ Failed to create {record['type']} record: {response.text}")
+        response = self._http_cf.post(
+            f"https://api.cloudflare.com/client/v4/zones/{zone_id}/dns_records",
+            json=payload,
+            timeout=API_TIMEOUT
+        )
+        
+        if response.status_code == 200:
+            print(f"  ✓ Created {record['type']} record for {record['name']}")
+        else:
+            print(f"  ✗ Failed to create {record['type']} record: {response.text}")
     
     def setup_mail_server(self):
         """Setup mail server configuration"""
@@ -299,18 +426,20 @@ echo "VPS setup completed at $(date)" > /tmp/setup-log.txt
         # Wait for cloud-init to complete
         self.wait_for_cloud_init()
         
-        # Configure Postfix
-        self.configure_postfix()
-        
-        # Configure Dovecot
-        self.configure_dovecot()
+        # Postfix, Dovecot and the database schema don't depend on each other,
+        # so configure them side by side over the same SSH connection
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            steps = [
+                executor.submit(self.configure_postfix),
+                executor.submit(self.configure_dovecot),
+                executor.submit(self.create_mail_database_structure)
+            ]
+            for step in steps:
+                step.result()
         
         # Setup SSL certificates
         self.setup_ssl_certificates()
         
-        # Create database structure
-        self.create_mail_database_structure()
-        
         print("✅ Mail server configured")
     
     def connect_ssh(self):
@@ -318,16 +447,31 @@ echo "VPS setup completed at $(date)" > /tmp/setup-log.txt
         self.ssh_client = paramiko.SSHClient()
         self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         self.ssh_client.connect(self.vps_ip, username='root')
+        self.ssh_client.get_transport().set_keepalive(30)
+    
+    def _exec(self, cmd, input_data=None):
+        """Run a command on the VPS and wait for it; returns (exit_status, stdout, stderr)"""
+        stdin, stdout, stderr = self.ssh_client.exec_command(cmd)
+        if input_data is not None:
+            stdin.write(input_data)
+            stdin.channel.shutdown_write()
+        output = stdout.read().decode()
+        errors = stderr.read().decode()
+        return stdout.channel.recv_exit_status(), output, errors
     
     def wait_for_cloud_init(self):
         """Wait for cloud-init to complete"""
         print("⏳ Waiting for initial setup to complete...")
         
+        # Wait on the VPS itself so the marker is seen as soon as it appears
+        wait_cmd = "timeout 300 sh -c 'until [ -f /tmp/cloud-init-complete ]; do sleep 1; done' && echo 'ready'"
+        delay = 2.0
         while True:
-            stdin, stdout, stderr = self.ssh_client.exec_command("test -f /tmp/cloud-init-complete && echo 'ready'")
-            if stdout.read().decode().strip() == 'ready':
+            _, output, _ = self._exec(wait_cmd)
+            if output.strip() == 'ready':
                 break
-            time.sleep(30)
+            time.sleep(delay)
+            delay = min(delay * 1.5, 30)
         
         print("✅ Initial setup completed")
     
@@ -398,15 +542,16 @@ query = SELECT destination FROM aliases WHERE source='%s'
         }
         
         # Upload configurations
-        self.upload_file_content('/etc/postfix/main.cf', postfix_main_cf)
-        
+        mysql_configs['/etc/postfix/main.cf'] = postfix_main_cf
         for file_path, content in mysql_configs.items():
             self.upload_file_content(file_path, content)
         
         # Set permissions and restart
-        self.ssh_client.exec_command("chmod 640 /etc/postfix/mysql-*.cf")
-        self.ssh_client.exec_command("chown root:postfix /etc/postfix/mysql-*.cf")
-        self.ssh_client.exec_command("systemctl restart postfix")
+        self._exec("bash -s", input_data=(
+            "chmod 640 /etc/postfix/mysql-*.cf\n"
+            "chown root:postfix /etc/postfix/mysql-*.cf\n"
+            "systemctl restart postfix\n"
+        ))
     
     def configure_dovecot(self):
         """Configure Dovecot IMAP/POP3 server"""
@@ -471,33 +616,34 @@ user_query = SELECT '/var/mail/vhosts/%d/%n' as home, 'maildir:/var/mail/vhosts/
         self.upload_file_content('/etc/dovecot/dovecot.conf', dovecot_conf)
         self.upload_file_content('/etc/dovecot/dovecot-sql.conf.ext', dovecot_sql_conf)
         
-        # Create mail directories and user
-        self.ssh_client.exec_command("groupadd -g 5000 vmail")
-        self.ssh_client.exec_command("useradd -g vmail -u 5000 vmail -d /var/mail")
-        self.ssh_client.exec_command("mkdir -p /var/mail/vhosts")
-        self.ssh_client.exec_command("chown -R vmail:vmail /var/mail")
-        
-        # Set permissions and restart
-        self.ssh_client.exec_command("chown -R vmail:dovecot /etc/dovecot")
-        self.ssh_client.exec_command("chmod -R o-rwx /etc/dovecot")
-        self.ssh_client.exec_command("systemctl restart dovecot")
+        self._exec("bash -s", input_data=(
+            # Create mail directories and user
+            "groupadd -g 5000 vmail\n"
+            "useradd -g vmail -u 5000 vmail -d /var/mail\n"
+            "mkdir -p /var/mail/vhosts\n"
+            "chown -R vmail:vmail /var/mail\n"
+            # Set permissions and restart
+            "chown -R vmail:dovecot /etc/dovecot\n"
+            "chmod -R o-rwx /etc/dovecot\n"
+            "systemctl restart dovecot\n"
+        ))
     
     def setup_ssl_certificates(self):
         """Setup SSL certificates with Let's Encrypt"""
         primary_domain = self.config['domains'][0]
         
-        # Stop nginx temporarily
-        self.ssh_client.exec_command("systemctl stop nginx")
-        
-        # Generate certificate for mail subdomain
-        cmd = f"certbot certonly --standalone -d mail.{primary_domain} --non-interactive --agree-tos --email {self.config['email_settings']['admin_email']}"
-        self.ssh_client.exec_command(cmd)
-        
-        # Start nginx
-        self.ssh_client.exec_command("systemctl start nginx")
-        
-        # Setup auto-renewal
-        self.ssh_client.exec_command("systemctl enable certbot.timer")
+        # certbot's HTTP challenge needs mail.<domain> to point here
+        if self._dns_ready is not None:
+            self._dns_ready.result()
+        
+        # Free port 80 for certbot's standalone server, issue the certificate
+        # for the mail subdomain, then bring nginx back and enable auto-renewal
+        self._exec("bash -s", input_data=(
+            "systemctl stop nginx\n"
+            f"certbot certonly --standalone -d mail.{primary_domain} --non-interactive --agree-tos --email {self.config['email_settings']['admin_email']}\n"
+            "systemctl start nginx\n"
+            "systemctl enable certbot.timer\n"
+        ))
     
     def create_mail_database_structure(self):
         """Create database structure for mail server"""
@@ -533,10 +679,17 @@ CREATE TABLE IF NOT EXISTS aliases (
 );
 """
         
-        # Execute SQL commands
-        sql_file = "/tmp/mail_structure.sql"
-        self.upload_file_content(sql_file, sql_commands)
-        self.ssh_client.exec_command(f"mysql -u root -p{mysql_password} < {sql_file}")
+        # Execute SQL commands; the password travels in MYSQL_PWD over stdin
+        # so it never appears in a command line or needs shell escaping
+        script = (
+            f"export MYSQL_PWD={shlex.quote(mysql_password)}\n"
+            "mysql -u root <<'SQL'\n"
+            f"{sql_commands}"
+            "SQL\n"
+        )
+        exit_status, _, errors = self._exec("bash -s", input_data=script)
+        if exit_status != 0:
+            raise Exception(f"Failed to create mail database structure: {errors}")
     
     def create_email_accounts(self):
         """Create email accounts for all domains"""
@@ -545,36 +698,82 @@ CREATE TABLE IF NOT EXISTS aliases (
         mysql_password = self.config['server_settings']['mysql_root_password']
         mail_db_password = self.config['server_settings']['mail_db_password']
         
+        emails_per_domain = self.config['email_settings']['emails_per_domain']
+        passwords = iter(self._bulk_passwords(len(self.config['domains']) * emails_per_domain, 16))
+        
+        user_rows = []
+        mailbox_dirs = []
         for domain in self.config['domains']:
-            # Insert domain
-            self.ssh_client.exec_command(f"mysql -u root -p{mysql_password} -e \"INSERT IGNORE INTO mailserver.domains (domain) VALUES ('{domain}');\"")
-            
             # Create email accounts for this domain
-            for i in range(self.config['email_settings']['emails_per_domain']):
-                email_account = self.create_single_email_account(domain, mysql_password)
+            taken = set()
+            for i in range(emails_per_domain):
+                email_account = self.create_single_email_account(domain, user_rows, next(passwords), taken)
                 self.email_accounts.append(email_account)
+                mailbox_dirs.append(f"/var/mail/vhosts/{domain}/{email_account['username']}")
+        
+        # Insert every domain and user in one transaction over an SSH tunnel
+        port = self._open_mysql_tunnel()
+        db = mysql.connector.connect(
+            host='127.0.0.1',
+            port=port,
+            user='root',
+            password=mysql_password,
+            database='mailserver',
+            connection_timeout=MYSQL_TIMEOUT
+        )
+        try:
+            cursor = db.cursor()
+            cursor.executemany(
+                "INSERT IGNORE INTO domains (domain) VALUES (%s)",
+                [(domain,) for domain in self.config['domains']]
+            )
+            cursor.execute(
+                f"SELECT domain, id FROM domains WHERE domain IN ({', '.join(['%s'] * len(self.config['domains']))})",
+                self.config['domains']
+            )
+            domain_ids = dict(cursor.fetchall())
+            cursor.executemany(
+                "INSERT INTO users (email, password, domain_id) VALUES (%s, %s, %s)",
+                [(email, hashed, domain_ids[domain]) for email, hashed, domain in user_rows]
+            )
+            db.commit()
+        finally:
+            db.close()
+        
+        # Create every mailbox and fix ownership in one remote shell
+        domain_dirs = " ".join(f"/var/mail/vhosts/{domain}" for domain in self.config['domains'])
+        script = (
+            "set -e\n"
+            f"mkdir -p {' '.join(mailbox_dirs)}\n"
+            f"chown -R vmail:vmail {domain_dirs}\n"
+        )
+        exit_status, _, errors = self._exec("bash -s", input_data=script)
+        if exit_status != 0:
+            raise Exception(f"Failed to create mailboxes: {errors}")
         
         print(f"✅ Created {len(self.email_accounts)} email accounts")
         return self.email_accounts
     
-    def create_single_email_account(self, domain, mysql_password):
-        """Create a single email account"""
+    def create_single_email_account(self, domain, user_rows, password=None, taken=None):
+        """Create a single email account, queueing (email, hash, domain) in user_rows
+
+        The mailbox directory is created by create_email_accounts. Usernames
+        already in taken are avoided, and the new one is added to it.
+        """
         # Generate account details
-        username = self.generate_random_username()
+        if taken is None:
+            taken = set()
+        username = self.generate_random_username(taken)
+        taken.add(username)
         email = f"{username}@{domain}"
-        password = self.generate_secure_password(16)
-        
-        # Hash password for database
-        stdin, stdout, stderr = self.ssh_client.exec_command(f"python3 -c \"import crypt; print(crypt.crypt('{password}', crypt.mksalt(crypt.METHOD_SHA512)))\"")
-        hashed_password = stdout.read().decode().strip()
+        if password is None:
+            password = self.generate_secure_password(16)
         
-        # Insert user into database
-        sql_cmd = f"""mysql -u root -p{mysql_password} -e "INSERT INTO mailserver.users (email, password, domain_id) SELECT '{email}', '{hashed_password}', id FROM mailserver.domains WHERE domain='{domain}';" """
-        self.ssh_client.exec_command(sql_cmd)
+        # Hash password for database (SHA512-CRYPT, as dovecot expects)
+        hashed_password = sha512_crypt.using(rounds=5000).hash(password)
         
-        # Create mailbox directory
-        self.ssh_client.exec_command(f"mkdir -p /var/mail/vhosts/{domain}/{username}")
-        self.ssh_client.exec_command(f"chown -R vmail:vmail /var/mail/vhosts/{domain}")
+        # Queue the user row for the bulk insert
+        user_rows.append((email, hashed_password, domain))
         
         account = {
             'email': email,
@@ -599,36 +798,83 @@ CREATE TABLE IF NOT EXISTS aliases (
         
         return account
     
-    def generate_random_username(self):
-        """Generate a random username"""
-        first_names = ['alex', 'jordan', 'morgan', 'casey', 'taylor', 'riley', 'sage', 'quinn']
-        last_names = ['smith', 'johnson', 'williams', 'brown', 'jones', 'garcia', 'miller']
-        return f"{secrets.choice(first_names)}.{secrets.choice(last_names)}"
+    def generate_random_username(self, taken=()):
+        """Generate a random username, numbering it if the name is in taken"""
+        base = f"{secrets.choice(FIRST_NAMES)}.{secrets.choice(LAST_NAMES)}"
+        username = base
+        suffix = 1
+        while username in taken:
+            suffix += 1
+            username = f"{base}{suffix}"
+        return username
+    
+    def _open_mysql_tunnel(self):
+        """Forward a local port to MySQL on the VPS over the SSH transport; returns the port"""
+        transport = self.ssh_client.get_transport()
+        
+        # Open the channel before listening so a refused forward is raised
+        # here rather than surfacing as a hung or dropped MySQL connection
+        try:
+            channel = transport.open_channel(
+                'direct-tcpip', ('127.0.0.1', 3306), ('127.0.0.1', 0), timeout=MYSQL_TIMEOUT
+            )
+        except (paramiko.SSHException, OSError) as e:
+            raise Exception(f"Failed to forward a port to MySQL on the VPS: {e}") from e
+        
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        listener.settimeout(MYSQL_TIMEOUT)
+        
+        def forward():
+            with listener:
+                try:
+                    client, _ = listener.accept()
+                except OSError:
+                    channel.close()
+                    return
+            with client, channel:
+                while True:
+                    readable, _, _ = select.select([client, channel], [], [])
+                    if client in readable:
+                        data = client.recv(32768)
+                        if not data:
+                            break
+                        channel.sendall(data)
+                    if channel in readable:
+                        data = channel.recv(32768)
+                        if not data:
+                            break
+                        client.sendall(data)
+        
+        threading.Thread(target=forward, daemon=True).start()
+        return listener.getsockname()[1]
     
     def upload_file_content(self, remote_path, content):
         """Upload file content via SSH"""
-        sftp = self.ssh_client.open_sftp()
-        with sftp.file(remote_path, 'w') as f:
-            f.write(content)
-        sftp.close()
+        # One SFTP session serves every upload; the lock keeps concurrent
+        # configuration steps from interleaving requests on it
+        with self._sftp_lock:
+            if self._sftp is None:
+                self._sftp = self.ssh_client.open_sftp()
+            with self._sftp.file(remote_path, 'w') as f:
+                f.write(content)
     
     def run_comprehensive_tests(self):
         """Run comprehensive tests on the email setup"""
         print("🧪 Running comprehensive tests...")
         
-        test_results = {}
-        
-        # Test SMTP connectivity
-        test_results['smtp_connectivity'] = self.test_smtp_connectivity()
-        
-        # Test IMAP connectivity
-        test_results['imap_connectivity'] = self.test_imap_connectivity()
-        
-        # Test SSL certificates
-        test_results['ssl_certificates'] = self.test_ssl_certificates()
+        tests = {
+            'smtp_connectivity': self.test_smtp_connectivity,
+            'imap_connectivity': self.test_imap_connectivity,
+            'ssl_certificates': self.test_ssl_certificates,
+            'dns_propagation': self.test_dns_propagation
+        }
         
-        # Test DNS propagation
-        test_results['dns_propagation'] = self.test_dns_propagation()
+        # The tests are independent, so run them side by side
+        with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+            futures = {name: executor.submit(test) for name, test in tests.items()}
+            test_results = {name: future.result() for name, future in futures.items()}
         
         print("✅ Tests completed")
         return test_results
@@ -638,8 +884,8 @@ CREATE TABLE IF NOT EXISTS aliases (
         try:
             for account in self.email_accounts[:1]:  # Test first account
                 cmd = f"echo 'Test email' | mail -s 'Test from {account['email']}' {self.config['email_settings']['admin_email']}"
-                stdin, stdout, stderr = self.ssh_client.exec_command(cmd)
-                if stderr.read().decode().strip() == "":
+                _, _, errors = self._exec(cmd)
+                if errors.strip() == "":
                     return "PASS"
             return "FAIL"
         except:
@@ -652,13 +898,16 @@ CREATE TABLE IF NOT EXISTS aliases (
     
     def test_ssl_certificates(self):
         """Test SSL certificates"""
+        primary_domain = self.config['domains'][0]
+        context = ssl.create_default_context()
+        
+        # Connect by IP so the check does not depend on DNS propagation;
+        # SNI and hostname verification still use the mail hostname
         try:
-            primary_domain = self.config['domains'][0]
-            cmd = f"openssl s_client -connect mail.{primary_domain}:993 -servername mail.{primary_domain} < /dev/null"
-            stdin, stdout, stderr = self.ssh_client.exec_command(cmd)
-            output = stdout.read().decode()
-            if "Verify return code: 0 (ok)" in output:
-                return "PASS"
+            with socket.create_connection((self.vps_ip, 993), timeout=10) as sock:
+                with context.wrap_socket(sock, server_hostname=f"mail.{primary_domain}"):
+                    return "PASS"
+        except ssl.SSLCertVerificationError:
             return "FAIL"
         except:
             return "ERROR"
@@ -692,24 +941,37 @@ CREATE TABLE IF NOT EXISTS aliases (
         }
         
         # Save JSON report
-        with open(report_dir / "deployment_report.json", 'w') as f:
-            json.dump(report, f, indent=2)
-        
-        # Save credentials CSV
-        with open(report_dir / "email_credentials.csv", 'w') as f:
-            f.write("Domain,Email,Password,SMTP_Host,SMTP_Port,IMAP_Host,IMAP_Port\n")
-            for account in self.email_accounts:
-                f.write(f"{account['domain']},{account['email']},{account['password']},"
-                       f"{account['smtp_settings']['host']},{account['smtp_settings']['port']},"
-                       f"{account['imap_settings']['host']},{account['imap_settings']['port']}\n")
+        report_file = report_dir / "deployment_report.json"
+        if orjson is not None:
+            report_file.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+        else:
+            with open(report_file, 'w') as f:
+                json.dump(report, f, indent=2)
+        
+        # Save credentials CSV; csv.writer quotes passwords containing commas or quotes
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(["Domain", "Email", "Password", "SMTP_Host", "SMTP_Port", "IMAP_Host", "IMAP_Port"])
+        writer.writerows(
+            (account['domain'], account['email'], account['password'],
+             account['smtp_settings']['host'], account['smtp_settings']['port'],
+             account['imap_settings']['host'], account['imap_settings']['port'])
+            for account in self.email_accounts
+        )
+        (report_dir / "email_credentials.csv").write_text(buf.getvalue())
         
         print(f"📁 Report generated: {report_dir}")
         return str(report_dir)
     
     def cleanup_ssh(self):
         """Close SSH connection"""
+        if self._sftp:
+            self._sftp.close()
+            self._sftp = None
         if self.ssh_client:
             self.ssh_client.close()
+        self._http_do.close()
+        self._http_cf.close()
     
     def run_full_automation(self):
         """Run the complete automation pipeline"""
@@ -720,11 +982,12 @@ CREATE TABLE IF NOT EXISTS aliases (
             # Step 1: Provision VPS
             self.provision_vps()
             
-            # Step 2: Configure DNS
-            self.configure_dns_records()
-            
-            # Step 3: Setup mail server
-            self.setup_mail_server()
+            # Steps 2 and 3: configure DNS while the mail server is set up;
+            # setup_ssl_certificates waits for the records before running certbot
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                self._dns_ready = executor.submit(self.configure_dns_records)
+                self.setup_mail_server()
+                self._dns_ready.result()
             
             # Step 4: Create email accounts
             self.create_email_accounts()